@@ -2,16 +2,77 @@
 import os
 import sys
 
-from argparse import ArgumentParser
+from argparse import ArgumentParser, ArgumentTypeError
 from importlib import import_module
 
 
-parser = ArgumentParser(description='Run the elves game.')
-parser.add_argument('module', type=str, help='The module name to load.')
-args = parser.parse_args()
+def at_least_one(value):
+    """Parse a whole number of at least 1.
+    """
+    number = int(value)
+    if number < 1:
+        raise ArgumentTypeError('must be at least 1, not {}'.format(number))
+    return number
 
-current_dir = os.path.abspath(os.path.curdir)
-sys.path.append(current_dir)
-module = import_module(args.module)
-game = module.Game()
-game.run()
+
+def play(argv):
+    """Play a bot against the server.
+    """
+    parser = ArgumentParser(description='Run the elves game.')
+    parser.add_argument('module', type=str, help='The module name to load.')
+    parser.add_argument('--games', type=at_least_one, default=None,
+                        help='Play this many games concurrently.')
+    parser.add_argument('--concurrency', type=at_least_one, default=10,
+                        help='The most games to play at once with --games.')
+    args = parser.parse_args(argv)
+
+    module = import_module(args.module)
+
+    if args.games is None:
+        game = module.Game()
+        game.run()
+    else:
+        from pyne_xmas_elves.client.aio import run_games
+
+        games = run_games(module.Game, args.games, args.concurrency)
+        raised = sorted(game.amount_raised for game in games)
+        print('Played {} games\n'
+              '* mean raised: {:.2f}\n'
+              '* lowest raised: {}\n'
+              '* highest raised: {}'.format(len(raised),
+                                            sum(raised) / len(raised),
+                                            raised[0],
+                                            raised[-1]))
+
+
+def tournament(argv):
+    """Rank several bots by simulating games locally.
+    """
+    parser = ArgumentParser(prog='elves.py tournament',
+                            description='Rank bots using simulated games.')
+    parser.add_argument('modules', type=str, nargs='+',
+                        help='The module names to load.')
+    parser.add_argument('--games', type=at_least_one, default=10000,
+                        help='The games to simulate for each bot.')
+    parser.add_argument('--seed', type=int, default=0,
+                        help='The seed for the weather, shared by all bots.')
+    parser.add_argument('--processes', type=at_least_one, default=None,
+                        help='The worker processes, one per core by default.')
+    args = parser.parse_args(argv)
+
+    from pyne_xmas_elves.client.tournament import (format_results,
+                                                   run_tournament)
+
+    results = run_tournament(args.modules, args.games, args.seed,
+                             args.processes)
+    print(format_results(results))
+
+
+if __name__ == '__main__':
+    current_dir = os.path.abspath(os.path.curdir)
+    sys.path.append(current_dir)
+
+    if sys.argv[1:2] == ['tournament']:
+        tournament(sys.argv[2:])
+    else:
+        play(sys.argv[1:])
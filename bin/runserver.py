@@ -1,17 +1,192 @@
 #!/usr/bin/env python
+"""Run the Elves server.
+
+    runserver.py                Install, migrate and run the development server
+    runserver.py setup          Install the requirements and migrate
+    runserver.py production     Run the interface server and a pool of workers
+
+The production server doesn't install or migrate, run `setup` once per
+deploy instead. Send it SIGHUP to start fresh workers and stop the old ones
+once every thread has finished its current message, and SIGTERM to stop.
+"""
+import argparse
+import os
+import signal
 import subprocess
 import sys
+import tempfile
+import time
+
+MANAGE = os.path.join('server', 'manage.py')
 
+GROUP_COMMIT_THREADS = 8
 
-def run():
+
+def in_virtualenv():
     if not getattr(sys, 'base_prefix', ''):
         print('This must be run from within an virtualenv')
         exit(1)
 
-    print('Starting server...')
+
+def setup(args):
+    in_virtualenv()
     subprocess.run(['pip', 'install', '-r', 'requirements.txt'])
-    subprocess.run(['python', 'server/manage.py', 'migrate', '--noinput'])
-    subprocess.run(['python', 'server/manage.py', 'runserver'])
+    subprocess.run(['python', MANAGE, 'migrate', '--noinput'])
+
+
+def develop(args):
+    setup(args)
+    print('Starting server...')
+    subprocess.run(['python', MANAGE, 'runserver'])
+
+
+def production(args):
+    env = dict(os.environ)
+    env.setdefault('ELVES_CHANNEL_LAYER', 'ipc')
+    env.setdefault('ELVES_CACHE_DIR',
+                   os.path.join(tempfile.gettempdir(), 'elves-cache'))
+    if env['ELVES_CHANNEL_LAYER'] == 'inmemory':
+        print('The in-memory channel layer cannot be shared by workers, '
+              'set ELVES_CHANNEL_LAYER to ipc or redis')
+        exit(1)
+
+    # Group commit only batches the turns played by threads of one worker.
+    threads = args.threads
+    if float(env.get('ELVES_GROUP_COMMIT') or 0):
+        threads = threads or GROUP_COMMIT_THREADS
+        if threads < 2:
+            print('Group commit needs workers with several threads, set '
+                  '--threads or unset ELVES_GROUP_COMMIT')
+            exit(1)
+
+    pool = WorkerPool(args.workers, threads or 1, args.bind, args.port, env)
+    exit(pool.run())
+
+
+class WorkerPool:
+    """Run the interface server and keep a number of workers running.
+
+    The interface server takes HTTP and websocket connections and passes them
+    to the workers over the shared channel layer, so workers can be replaced
+    without dropping connections.
+    """
+
+    def __init__(self, workers, threads, bind, port, env):
+        self.size = workers
+        self.threads = threads
+        self.bind = bind
+        self.port = port
+        self.env = env
+
+        self.interface = None
+        self.workers = []
+        self.retired = []
+
+        self._reload = False
+        self._stop = False
+
+    def run(self):
+        """Start every process and supervise them until stopped.
+
+        Returns the exit status.
+        """
+        signal.signal(signal.SIGHUP, self._on_reload)
+        signal.signal(signal.SIGTERM, self._on_stop)
+        signal.signal(signal.SIGINT, self._on_stop)
+
+        print('Starting {} workers on {}:{}...'.format(
+            self.size, self.bind, self.port))
+        self.interface = self._spawn([
+            os.path.join(os.path.dirname(sys.executable), 'daphne'),
+            '--bind', self.bind, '--port', str(self.port),
+            'elves.asgi:channel_layer'])
+        self.workers = [self._spawn_worker() for _ in range(self.size)]
+
+        while not self._stop:
+            time.sleep(0.5)
+
+            if self.interface.poll() is not None:
+                print('The interface server exited, stopping')
+                self.stop()
+                return 1
+
+            if self._reload:
+                self._reload = False
+                self.reload()
+
+            for i, worker in enumerate(self.workers):
+                if worker.poll() is not None:
+                    print('Worker {} exited, restarting'.format(worker.pid))
+                    self.workers[i] = self._spawn_worker()
+            self.retired = [p for p in self.retired if p.poll() is None]
+
+        self.stop()
+        return 0
+
+    def reload(self):
+        """Start new workers, then ask the old ones to finish and exit.
+        """
+        print('Reloading workers...')
+        old = self.workers
+        self.workers = [self._spawn_worker() for _ in range(self.size)]
+        for worker in old:
+            worker.terminate()
+        self.retired.extend(old)
+
+    def stop(self, timeout=10):
+        """Ask every process to exit, killing any still running after the
+        timeout.
+        """
+        processes = [self.interface] + self.workers + self.retired
+        for process in processes:
+            if process.poll() is None:
+                process.terminate()
+
+        deadline = time.time() + timeout
+        for process in processes:
+            try:
+                process.wait(max(deadline - time.time(), 0))
+            except subprocess.TimeoutExpired:
+                process.kill()
+
+    def _spawn_worker(self):
+        return self._spawn([sys.executable, 'manage.py', 'elves_worker',
+                            '--threads', str(self.threads)])
+
+    def _spawn(self, command):
+        return subprocess.Popen(command, cwd='server', env=self.env)
+
+    def _on_reload(self, signum, frame):
+        self._reload = True
+
+    def _on_stop(self, signum, frame):
+        self._stop = True
+
+
+def run(argv=None):
+    parser = argparse.ArgumentParser(description='Run the Elves server.')
+    parser.set_defaults(command=develop)
+    commands = parser.add_subparsers()
+
+    commands.add_parser('setup').set_defaults(command=setup)
+
+    production_parser = commands.add_parser('production')
+    production_parser.set_defaults(command=production)
+    production_parser.add_argument('--workers', type=int,
+                                   default=os.cpu_count() or 1,
+                                   help='The number of worker processes.')
+    production_parser.add_argument('--threads', type=int,
+                                   help='The number of threads per worker. '
+                                   'Defaults to {} with ELVES_GROUP_COMMIT '
+                                   'set, otherwise 1.'.format(
+                                       GROUP_COMMIT_THREADS))
+    production_parser.add_argument('--bind', default='127.0.0.1',
+                                   help='The address to listen on.')
+    production_parser.add_argument('--port', type=int, default=8000,
+                                   help='The port to listen on.')
+
+    args = parser.parse_args(argv)
+    args.command(args)
 
 
 if __name__ == '__main__':
@@ -1 +1,4 @@
+from .aio import AsyncBaseGame
 from .base import BaseGame
+
+__all__ = ['AsyncBaseGame', 'BaseGame']
@@ -0,0 +1,151 @@
+"""Play many games concurrently using asyncio.
+
+This needs aiohttp, which can be installed with:
+
+    pip install pyne-xmas-elves[async]
+"""
+import asyncio
+import json
+
+from decimal import Decimal
+from urllib.parse import urljoin
+
+try:
+    import aiohttp
+except ImportError:
+    aiohttp = None
+
+from .base import BaseGame
+from .exceptions import (ConnectToServerException, NotSetupException,
+                         ServerResponseException, WrongElvesException)
+
+
+class AsyncBaseGame(BaseGame):
+    """The Base Game for playing over a shared asyncio HTTP session.
+
+    Implement `turn` exactly as for BaseGame. Games are created with the
+    aiohttp session to send requests with, then played with `await
+    game.run()`.
+    """
+
+    def __init__(self, http):
+        if not self.PLAYER_NAME:
+            raise NotSetupException(
+                'You must set PLAYER_NAME on {}'.format(
+                    self.__class__.__name__))
+
+        self._http = http
+        self._session_id = None
+        self._elves = None
+        self._money = None
+        self._weather = None
+        self._current_turn = None
+
+    async def run(self):
+        """Start a session and play every turn.
+        """
+        uuid, elves, money = await self.start_session()
+        self._session_id = uuid
+        self._elves = elves
+        self._money = money
+
+        for turn in range(1, self.MAX_TURNS + 1):
+            self._current_turn = turn
+
+            woods, forest, mountain = self.turn(self._elves)
+
+            if not self._is_enough_elves(woods, forest, mountain, self._elves):
+                raise WrongElvesException(woods, forest, mountain, self._elves)
+
+            data = await self._send_elves(woods, forest, mountain)
+            self._money += Decimal(data['money_made'])
+            self._elves = data['elves_returned']
+            self._weather = data['weather']
+
+    async def start_session(self):
+        """Generate a Session ID and return it.
+        """
+        url = urljoin(self.SERVER_URL, "game/")
+        data = await self._post(url, {'player_name': self.PLAYER_NAME})
+        return (data['uuid'],
+                data['elves_remaining'],
+                Decimal(data['money_made']))
+
+    async def _send_elves(self, woods, forest, mountain):
+        """Send decision on elves distribution to the server.
+
+        Does not check if game rules were followed.
+        """
+        path = 'game/{s._session_id}/day/'.format(s=self)
+        url = urljoin(self.SERVER_URL, path)
+        data = {
+            'elves_woods': woods,
+            'elves_forest': forest,
+            'elves_mountains': mountain
+        }
+        return await self._post(url, data)
+
+    async def _post(self, url, data):
+        """POST the data as JSON and return the decoded response.
+        """
+        async with self._http.post(url, json=data) as response:
+            text = await response.text()
+
+        if response.status != 201:
+            if response.status == 400:
+                raise ServerResponseException(_Response(response.status, text))
+            else:
+                raise ConnectToServerException(
+                    _Response(response.status, text))
+
+        return json.loads(text)
+
+
+class _Response:
+    """A response that has been read, shaped like a requests Response.
+
+    This lets the client exceptions report aiohttp errors.
+    """
+
+    def __init__(self, status_code, text):
+        self.status_code = status_code
+        self.text = text
+
+    def json(self):
+        return json.loads(self.text)
+
+
+async def play_games(game_class, games, concurrency=10):
+    """Play the game the given number of times and return the games.
+
+    At most `concurrency` games are played at once, sharing a pool of
+    keep-alive connections of the same size. `game_class` can be either a
+    BaseGame or AsyncBaseGame subclass.
+    """
+    if aiohttp is None:
+        raise NotSetupException(
+            'aiohttp must be installed to play games concurrently: '
+            'pip install pyne-xmas-elves[async]')
+    if concurrency < 1:
+        raise ValueError('concurrency must be at least 1')
+
+    game_class = AsyncBaseGame.from_game(game_class)
+    limit = asyncio.Semaphore(concurrency)
+    connector = aiohttp.TCPConnector(limit=concurrency)
+
+    async with aiohttp.ClientSession(connector=connector) as http:
+        async def play():
+            async with limit:
+                game = game_class(http)
+                await game.run()
+                return game
+
+        return await asyncio.gather(*(play() for _ in range(games)))
+
+
+def run_games(game_class, games, concurrency=10):
+    """Play the games from synchronous code, see `play_games`.
+    """
+    loop = asyncio.get_event_loop()
+    return loop.run_until_complete(
+        play_games(game_class, games, concurrency))
@@ -32,6 +32,16 @@ class BaseGame:
         self._weather = None
         self._current_turn = None
 
+    @classmethod
+    def from_game(cls, game_class):
+        """Return a version of the BaseGame subclass played by this class.
+
+        The game's `turn` is used unchanged, but its `__init__` is not called.
+        """
+        if issubclass(game_class, cls):
+            return game_class
+        return type(game_class.__name__, (cls, game_class), {})
+
     @property
     def amount_raised(self):
         return self._money
@@ -28,7 +28,10 @@ class ServerResponseException(Exception):
         """Generate a readable message.
         """
         content = response.json()
-        errors = '\n'.join(': '.join((k, v)) for k, v in content.items())
+        errors = '\n'.join(
+            '{}: {}'.format(k, v if isinstance(v, str) else
+                            ' '.join(map(str, v)))
+            for k, v in content.items())
         msg = 'The server did not like your response: {}'.format(errors)
         super().__init__(msg, *args, **kwargs)
 
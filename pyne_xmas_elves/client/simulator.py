@@ -0,0 +1,184 @@
+"""Simulate games locally to evaluate a strategy without a server.
+
+The game rules are applied to whole batches of games at once with NumPy,
+which can be installed with:
+
+    pip install pyne-xmas-elves[simulate]
+"""
+from decimal import Decimal
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+from .base import BaseGame
+from .exceptions import NotSetupException, WrongElvesException
+
+# These mirror the rules in the server's Day model.
+ELVES_START = 12
+WOODS_VALUE = 10
+FOREST_VALUE = 20
+MOUNTAINS_VALUE = 50
+WEATHER = ('good', 'good', 'snow')
+
+
+class SimulatedGame(BaseGame):
+    """A BaseGame whose state is set by the simulator instead of a server.
+    """
+
+    def __init__(self):
+        self._session_id = None
+        self._elves = None
+        self._money = None
+        self._weather = None
+        self._current_turn = None
+
+    def run(self):
+        raise NotImplementedError('Simulated games are played by simulate().')
+
+
+class SimulationResult:
+    """The money raised by each simulated game.
+    """
+
+    QUANTILES = (0.05, 0.25, 0.5, 0.75, 0.95)
+
+    def __init__(self, amounts):
+        self.amounts = amounts
+
+    def __len__(self):
+        return len(self.amounts)
+
+    @property
+    def mean(self):
+        return float(self.amounts.mean())
+
+    @property
+    def variance(self):
+        return float(self.amounts.var())
+
+    def confidence_interval(self, z=1.96):
+        """Return the (low, high) confidence interval of the mean.
+
+        The default z gives a 95% interval.
+        """
+        error = z * float(self.amounts.std()) / len(self) ** 0.5
+        return self.mean - error, self.mean + error
+
+    def quantiles(self, quantiles=QUANTILES):
+        """Return a dict of quantile -> amount raised.
+        """
+        values = numpy.percentile(self.amounts,
+                                  [q * 100 for q in quantiles])
+        return {q: float(v) for q, v in zip(quantiles, values)}
+
+    def summary(self):
+        """Return the games played, mean, variance and quantiles.
+        """
+        return {
+            'games': len(self),
+            'mean': self.mean,
+            'variance': self.variance,
+            'quantiles': self.quantiles(),
+        }
+
+
+def simulate(game_class, games, seed=None, elves_start=ELVES_START,
+             batch_size=10000):
+    """Play the game the given number of times and return the results.
+
+    `game_class` is a BaseGame subclass, used unchanged. Games are played in
+    batches of `batch_size`, holding each batch's state in arrays and
+    applying each turn's weather to the whole batch at once. Passing a
+    `seed` makes the weather reproducible.
+
+    A game can split a whole batch's elves at once by defining a classmethod
+    `turn_batch(elves, turn)`, which is given an array of the elves each game
+    has and the turn number, and returns the arrays of elves sent to the
+    woods, forest and mountains. Otherwise `turn` is called for each game.
+    """
+    if numpy is None:
+        raise NotSetupException(
+            'numpy must be installed to simulate games: '
+            'pip install pyne-xmas-elves[simulate]')
+
+    game_class = SimulatedGame.from_game(game_class)
+    random = numpy.random.RandomState(seed)
+
+    amounts = numpy.empty(games, dtype=numpy.int64)
+    for start in range(0, games, batch_size):
+        size = min(batch_size, games - start)
+        amounts[start:start + size] = _simulate_batch(
+            game_class, size, random, elves_start)
+
+    return SimulationResult(amounts)
+
+
+def apply_weather(woods, forest, mountains, good):
+    """Return the (money made, elves returned) arrays of a turn.
+
+    `good` is an array saying whether each game had good weather. Elves in
+    the mountains are lost in the snow, and only the woods pay out.
+    """
+    money = woods * WOODS_VALUE + numpy.where(
+        good, forest * FOREST_VALUE + mountains * MOUNTAINS_VALUE, 0)
+    elves = woods + forest + numpy.where(good, mountains, 0)
+    return money, elves
+
+
+def _simulate_batch(game_class, size, random, elves_start):
+    """Play a batch of games and return an array of the money raised.
+
+    Games that define `turn_batch` split the whole batch's elves in one
+    call, others have `turn` called once for each game.
+    """
+    batched = getattr(game_class, 'turn_batch', None) is not None
+    players = None if batched else [game_class() for _ in range(size)]
+    elves = numpy.full(size, elves_start, dtype=numpy.int64)
+    money = numpy.zeros(size, dtype=numpy.int64)
+    good = None
+    decimals = {}
+
+    for turn in range(1, game_class.MAX_TURNS + 1):
+        if batched:
+            woods, forest, mountains = (
+                numpy.asarray(sent, dtype=numpy.int64)
+                for sent in game_class.turn_batch(elves, turn))
+        else:
+            woods, forest, mountains = _play_turn(
+                players, turn, elves, money, good, decimals)
+
+        wrong = ((woods < 0) | (forest < 0) | (mountains < 0) |
+                 (woods + forest + mountains != elves))
+        if wrong.any():
+            game = int(wrong.argmax())
+            raise WrongElvesException(int(woods[game]), int(forest[game]),
+                                      int(mountains[game]), int(elves[game]))
+
+        good = random.randint(len(WEATHER), size=size) < WEATHER.count('good')
+        made, elves = apply_weather(woods, forest, mountains, good)
+        money += made
+
+    return money
+
+
+def _play_turn(players, turn, elves, money, good, decimals):
+    """Call `turn` on each player and return the arrays of elves sent.
+    """
+    weather = ([None] * len(players) if good is None else
+               numpy.where(good, 'good', 'snow').tolist())
+
+    sent = []
+    for player, total, raised, previous in zip(
+            players, elves.tolist(), money.tolist(), weather):
+        if raised not in decimals:
+            decimals[raised] = Decimal(raised)
+
+        player._current_turn = turn
+        player._elves = total
+        player._money = decimals[raised]
+        player._weather = previous
+        sent.append(player.turn(total))
+
+    return numpy.array(sent, dtype=numpy.int64).reshape(-1, 3).T
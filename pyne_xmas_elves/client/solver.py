@@ -0,0 +1,150 @@
+"""Solve the game exactly for the strategy that raises the most on average.
+
+The weather doesn't depend on anything that has happened before, so the best
+split of elves only depends on how many turns and elves are left. Each of
+these states is solved once and the best split is stored in a policy table:
+`policy[turns_left][elves] == (woods, forest, mountains)`.
+
+The solved table for the standard game ships as `policy.json`, regenerate it
+with:
+
+    python -m pyne_xmas_elves.client.solver
+"""
+import json
+
+from fractions import Fraction
+from functools import lru_cache
+from os import path
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+from .base import BaseGame
+
+# These mirror the rules in the server's Day model.
+ELVES_START = 12
+WOODS_VALUE = 10
+FOREST_VALUE = 20
+MOUNTAINS_VALUE = 50
+GOOD_WEATHER = Fraction(2, 3)
+
+POLICY_FILE = path.join(path.dirname(path.abspath(__file__)), 'policy.json')
+
+
+def solve(max_turns=BaseGame.MAX_TURNS, max_elves=ELVES_START):
+    """Return the expected values and the policy table for every state.
+
+    `values[turns_left][elves]` is the exact expected money raised over the
+    rest of the game, as a Fraction. Both tables have `None` for 0 turns
+    left.
+    """
+    @lru_cache(maxsize=None)
+    def best(turns_left, elves):
+        """Return the (value, split) of the best split for the state.
+
+        Ties go to the split that risks the fewest elves.
+        """
+        if not turns_left:
+            return Fraction(0), None
+
+        good_later = best(turns_left - 1, elves)[0]
+        options = []
+        for mountains in range(elves + 1):
+            for forest in range(elves - mountains + 1):
+                woods = elves - mountains - forest
+                snow_later = best(turns_left - 1, woods + forest)[0]
+                value = (
+                    woods * WOODS_VALUE +
+                    GOOD_WEATHER * (forest * FOREST_VALUE +
+                                    mountains * MOUNTAINS_VALUE +
+                                    good_later) +
+                    (1 - GOOD_WEATHER) * snow_later)
+                options.append((value, -mountains, -forest,
+                                (woods, forest, mountains)))
+
+        value, _, _, split = max(options)
+        return value, split
+
+    values = [None]
+    policy = [None]
+    for turns_left in range(1, max_turns + 1):
+        states = [best(turns_left, elves) for elves in range(max_elves + 1)]
+        values.append([value for value, _ in states])
+        policy.append([split for _, split in states])
+    return values, policy
+
+
+def save_policy(policy, filename=POLICY_FILE):
+    """Write the policy table as compact JSON.
+    """
+    with open(filename, 'w') as f:
+        json.dump(policy, f, separators=(',', ':'))
+
+
+def load_policy(filename=POLICY_FILE):
+    """Read a policy table written by `save_policy`.
+    """
+    with open(filename) as f:
+        policy = json.load(f)
+    return [None] + [[tuple(split) for split in turn] for turn in policy[1:]]
+
+
+class OptimalGame(BaseGame):
+    """Play the split with the highest expected money raised.
+
+    Set PLAYER_NAME on a subclass to play it against the server.
+    """
+
+    _policy = None
+    _policy_array = None
+
+    @classmethod
+    def get_policy(cls, turns_left=0, elves=0):
+        """Return the policy table, covering at least the given state.
+
+        The shipped table is loaded on first use. Games with more turns or
+        elves than the table are solved when first played.
+        """
+        policy = OptimalGame._policy
+        if policy is None:
+            policy = OptimalGame._policy = load_policy()
+
+        if turns_left >= len(policy) or elves >= len(policy[1]):
+            policy = OptimalGame._policy = solve(
+                max(turns_left, len(policy) - 1),
+                max(elves, len(policy[1]) - 1))[1]
+            OptimalGame._policy_array = None
+        return policy
+
+    @classmethod
+    def get_policy_array(cls, turns_left=0, elves=0):
+        """Return the policy table as an array indexed by
+        `[turns_left, elves]`, which needs NumPy.
+        """
+        policy = cls.get_policy(turns_left, elves)
+        if OptimalGame._policy_array is None:
+            OptimalGame._policy_array = numpy.array(
+                [[(0, 0, 0)] * len(policy[1])] + policy[1:],
+                dtype=numpy.int64)
+        return OptimalGame._policy_array
+
+    def turn(self, elves):
+        """Look up the best split for this turn.
+        """
+        turns_left = self.last_turn - self.current_turn + 1
+        return self.get_policy(turns_left, elves)[turns_left][elves]
+
+    @classmethod
+    def turn_batch(cls, elves, turn):
+        """Look up the best split for every game in a simulated batch.
+        """
+        turns_left = cls.MAX_TURNS - turn + 1
+        splits = cls.get_policy_array(turns_left, int(elves.max()))[
+            turns_left, elves]
+        return splits[:, 0], splits[:, 1], splits[:, 2]
+
+
+if __name__ == '__main__':
+    save_policy(solve()[1])
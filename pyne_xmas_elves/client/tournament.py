@@ -0,0 +1,62 @@
+"""Compare several bots by simulating many games of each.
+
+Each bot is a module with a `Game` class, as for `elves.py`. Every bot plays
+the same seeded weather, so differences in results come from the strategies.
+"""
+import os
+import sys
+
+from importlib import import_module
+from multiprocessing import Pool
+
+from .simulator import SimulationResult, numpy, simulate
+
+
+def run_tournament(modules, games=10000, seed=0, processes=None,
+                   chunk_size=1000):
+    """Simulate the games for each module and return the ranked results.
+
+    The games are split into seeded chunks of `chunk_size` and played
+    across a pool of `processes`, one per core by default. Returns a list
+    of (module, SimulationResult), highest mean first.
+    """
+    if games < 1:
+        raise ValueError('games must be at least 1')
+
+    chunks = [
+        (seed + i, min(chunk_size, games - start))
+        for i, start in enumerate(range(0, games, chunk_size))]
+    tasks = [
+        (module, size, chunk_seed, os.path.abspath(os.path.curdir))
+        for module in modules
+        for chunk_seed, size in chunks]
+
+    with Pool(processes or os.cpu_count()) as pool:
+        amounts = pool.map(_play_chunk, tasks, chunksize=1)
+
+    results = [
+        (module, SimulationResult(numpy.concatenate(
+            amounts[i * len(chunks):(i + 1) * len(chunks)])))
+        for i, module in enumerate(modules)]
+    return sorted(results, key=lambda result: result[1].mean, reverse=True)
+
+
+def format_results(results):
+    """Return the ranked results as a printable table.
+    """
+    lines = ['{:<4} {:<24} {:>8} {:>10}  {}'.format(
+        'Rank', 'Bot', 'Games', 'Mean', '95% interval')]
+    for rank, (module, result) in enumerate(results, start=1):
+        low, high = result.confidence_interval()
+        lines.append('{:<4} {:<24} {:>8} {:>10.2f}  {:.2f} - {:.2f}'.format(
+            rank, module, len(result), result.mean, low, high))
+    return '\n'.join(lines)
+
+
+def _play_chunk(task):
+    """Simulate one chunk of games for a bot in a worker process.
+    """
+    module, games, seed, path = task
+    if path not in sys.path:
+        sys.path.append(path)
+    return simulate(import_module(module).Game, games, seed=seed).amounts
@@ -0,0 +1,17 @@
+"""
+ASGI config for elves project.
+
+It exposes the channel layer as a module-level variable named
+``channel_layer``, for the interface server to pass requests to workers.
+
+For more information on this file, see
+https://channels.readthedocs.io/en/1.x/deploying.html
+"""
+
+import os
+
+from channels.asgi import get_channel_layer
+
+os.environ.setdefault("DJANGO_SETTINGS_MODULE", "elves.settings")
+
+channel_layer = get_channel_layer()
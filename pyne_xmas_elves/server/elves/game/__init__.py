@@ -0,0 +1 @@
+default_app_config = 'elves.game.apps.GameConfig'
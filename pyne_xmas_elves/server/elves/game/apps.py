@@ -2,4 +2,9 @@ from django.apps import AppConfig
 
 
 class GameConfig(AppConfig):
-    name = 'game'
+    name = 'elves.game'
+    label = 'game'
+
+    def ready(self):
+        # Connect the signal receivers.
+        from . import cache, storage  # noqa: F401
@@ -0,0 +1,217 @@
+"""Micro-benchmarks for the per-request hot paths.
+
+Benchmarks are written in the style of asv: a class's `setup` prepares the
+data and each `time_*` method is timed. Classes with `params` are run once
+for each number of sessions, against a generated database of that size.
+Run them with the `elves_microbench` command.
+"""
+import random
+
+from datetime import timedelta
+from decimal import Decimal
+from urllib.parse import parse_qs, urlparse
+from uuid import UUID
+
+from django.db import transaction
+from django.test import RequestFactory
+from django.utils import timezone
+from rest_framework.pagination import Cursor
+from rest_framework.request import Request
+
+from .filters import SessionFilterSet
+from .models import Day, Session
+from .paginators import CursorResultsPaginator, ResultsPaginator
+from .renderers import FastJSONRenderer
+from .serializers import (DaySerializer, SessionReadSerializer,
+                          SessionSerializer)
+
+SIZES = (1000, 10000, 100000, 1000000)
+
+PAGE_SIZE = 100
+
+BATCH_SIZE = 10000
+
+
+def generate_sessions(count, seed=0):
+    """Add generated sessions until there are `count` of them.
+
+    Sessions are spread over every day of play, with the completed ones on
+    the leaderboard. The same seed always generates the same sessions.
+    """
+    existing = Session.objects.count()
+    if existing > count:
+        raise ValueError('There are already {} sessions'.format(existing))
+
+    rng = random.Random('{}:{}'.format(seed, existing))
+    start = timezone.now() - timedelta(days=30)
+    with transaction.atomic():
+        for first in range(existing, count, BATCH_SIZE):
+            Session.objects.bulk_create(
+                _new_session(rng, i, start)
+                for i in range(first, min(first + BATCH_SIZE, count)))
+
+
+def _new_session(rng, index, start):
+    day_count = rng.randint(0, Session.MAX_DAYS)
+    money_total = Decimal(rng.randrange(0, 50000)).scaleb(-2)
+    return Session(
+        uuid=UUID(int=rng.getrandbits(128), version=4),
+        player_name='Player {}'.format(index),
+        created=start + timedelta(seconds=index),
+        day_count=day_count,
+        elves_remaining=rng.randint(0, 12),
+        money_total=money_total,
+        final_money=money_total if day_count >= Session.MAX_DAYS else None,
+        seed=index)
+
+
+def _new_days(count):
+    rng = random.Random(count)
+    days = []
+    for _ in range(count):
+        mountains = rng.randint(0, 12)
+        forest = rng.randint(0, 12 - mountains)
+        days.append(Day(weather=rng.choice(Session.WEATHER),
+                        elves_woods=12 - mountains - forest,
+                        elves_forest=forest, elves_mountains=mountains))
+    return days
+
+
+def _get_request(path, **query):
+    return Request(RequestFactory(SERVER_NAME='localhost').get(path, query))
+
+
+class DayProperties:
+    """The game rules, over a page of days.
+    """
+
+    def setup(self):
+        self.days = _new_days(PAGE_SIZE)
+
+    def time_money_made(self):
+        for day in self.days:
+            day.money_made
+
+    def time_elves_returned(self):
+        for day in self.days:
+            day.elves_returned
+
+
+class SessionProperties:
+    """The session totals, over a page of sessions.
+    """
+
+    def setup(self):
+        rng = random.Random(0)
+        now = timezone.now()
+        self.sessions = [_new_session(rng, i, now) for i in range(PAGE_SIZE)]
+
+    def time_money_made(self):
+        for session in self.sessions:
+            session.money_made
+
+    def time_etag(self):
+        for session in self.sessions:
+            session.etag
+
+
+class DayValidation:
+    """Validating a turn, without saving it.
+    """
+
+    def setup(self):
+        self.session = Session(elves_remaining=12, day_count=3)
+        self.data = {'elves_woods': 4, 'elves_forest': 4,
+                     'elves_mountains': 4}
+
+    def time_validate(self):
+        DaySerializer(context={'session': self.session}).validate(
+            dict(self.data))
+
+    def time_is_valid(self):
+        DaySerializer(data=self.data,
+                      context={'session': self.session}).is_valid()
+
+
+class SessionRendering:
+    """Serializing and rendering a page of sessions.
+    """
+
+    def setup(self):
+        rng = random.Random(0)
+        now = timezone.now()
+        self.sessions = [_new_session(rng, i, now) for i in range(PAGE_SIZE)]
+        self.data = SessionReadSerializer(self.sessions, many=True).data
+
+    def time_session_serializer(self):
+        SessionSerializer(self.sessions, many=True).data
+
+    def time_read_serializer(self):
+        SessionReadSerializer(self.sessions, many=True).data
+
+    def time_render(self):
+        FastJSONRenderer().render(self.data)
+
+
+class FilterActive:
+    """Filtering the sessions still being played.
+    """
+
+    params = SIZES
+    param_names = ('sessions',)
+
+    def setup(self, size):
+        generate_sessions(size)
+        self.queryset = Session.objects.with_totals()
+
+    def time_first_page(self, size):
+        filtered = SessionFilterSet().filter_active(
+            self.queryset, 'day_count', 'only')
+        list(filtered[:PAGE_SIZE])
+
+    def time_count(self, size):
+        SessionFilterSet().filter_active(
+            self.queryset, 'day_count', 'only').count()
+
+
+class Pagination:
+    """Reading the first and a middle page of sessions.
+    """
+
+    params = SIZES
+    param_names = ('sessions',)
+
+    def setup(self, size):
+        generate_sessions(size)
+        self.queryset = Session.objects.with_totals()
+        self.middle = size // 2
+
+        position = Session.objects.order_by('-created').values_list(
+            'created', flat=True)[self.middle]
+        paginator = CursorResultsPaginator()
+        paginator.base_url = '/game/'
+        link = paginator.encode_cursor(Cursor(offset=0, reverse=False,
+                                              position=str(position)))
+        self.cursor = parse_qs(urlparse(link).query)['cursor'][0]
+
+    def time_offset_first(self, size):
+        ResultsPaginator().paginate_queryset(
+            self.queryset, _get_request('/game/', limit=PAGE_SIZE))
+
+    def time_offset_middle(self, size):
+        ResultsPaginator().paginate_queryset(
+            self.queryset,
+            _get_request('/game/', limit=PAGE_SIZE, offset=self.middle))
+
+    def time_cursor_first(self, size):
+        CursorResultsPaginator().paginate_queryset(
+            self.queryset, _get_request('/game/', limit=PAGE_SIZE, cursor=''))
+
+    def time_cursor_middle(self, size):
+        CursorResultsPaginator().paginate_queryset(
+            self.queryset,
+            _get_request('/game/', limit=PAGE_SIZE, cursor=self.cursor))
+
+
+BENCHMARKS = (DayProperties, SessionProperties, DayValidation,
+              SessionRendering, FilterActive, Pagination)
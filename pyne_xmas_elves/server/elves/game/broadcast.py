@@ -0,0 +1,223 @@
+"""Batch session updates into frames for the websocket.
+
+Rather than sending every update as it happens, updates are collected for a
+short window and sent as a single frame to each interested group. Each frame
+looks like:
+
+    {"stream": "3f2a9c1e", "seq": 12,
+     "sessions": {"<uuid>": {"current_day": 4, ...}, ...}}
+
+Only the fields that changed since the session was last sent are included.
+`seq` goes up by one for every frame sent to a group, so a client that sees
+a gap has missed a frame and should reload. Each worker process numbers its
+own frames and names them with its own `stream`, so with several workers
+sharing a channel layer, clients follow `seq` separately for each stream.
+
+The groups are:
+
+* `session` - every update to every session.
+* `session-<uuid>` - updates to a single session.
+* `leaderboard` - ranked sessions as they complete, with all of their
+  fields.
+
+Sessions are submitted once their transaction commits and serialized and sent
+by a background thread, so requests don't wait on the websocket.
+"""
+import logging
+import os
+import queue
+import threading
+
+from collections import OrderedDict
+from json import dumps
+from uuid import uuid4
+
+from channels import Group
+from django.conf import settings
+
+from .metrics import Counter, Gauge, Histogram, registry
+from .models import Session
+from .serializers import SessionReadSerializer
+
+logger = logging.getLogger(__name__)
+
+ALL_GROUP = 'session'
+LEADERBOARD_GROUP = 'leaderboard'
+
+submitted_sessions = registry.register(Counter(
+    'elves_broadcast_sessions_total',
+    'Sessions submitted to be sent to the websocket.'))
+sent_frames = registry.register(Counter(
+    'elves_broadcast_frames_total',
+    'Frames sent to the websocket groups.',
+    labels=('group',)))
+frame_bytes = registry.register(Histogram(
+    'elves_broadcast_frame_bytes',
+    'Size of the frames sent to the websocket groups.',
+    labels=('group',),
+    buckets=(256, 1024, 4096, 16384, 65536, 262144, 1048576)))
+
+
+def session_group(uuid):
+    """Return the name of the group following a single session.
+
+    UUIDs are matched in any case, so the name always uses lower case.
+    """
+    return 'session-{}'.format(str(uuid).lower())
+
+
+def _get_group_label(group):
+    """Return the group to record metrics against, without the uuid.
+    """
+    return session_group('<uuid>') if group.startswith('session-') else group
+
+
+class Broadcaster:
+    """Collect session updates and send them to groups as delta frames.
+
+    The window comes from `ELVES_BROADCAST_WINDOW` in seconds. With a window
+    of 0 every update is sent straight away. The last state of up to
+    `max_sessions` sessions is remembered to compute deltas; a forgotten
+    session is sent in full.
+    """
+
+    def __init__(self, max_sessions=10000):
+        self.max_sessions = max_sessions
+
+        self._lock = threading.Lock()
+        self._pending = OrderedDict()
+        self._sent = OrderedDict()
+        self._seq = {}
+        self._timer = None
+
+        self._queue = queue.Queue()
+        self._worker = None
+
+        self._pid = None
+        self._stream = None
+
+    @property
+    def window(self):
+        return getattr(settings, 'ELVES_BROADCAST_WINDOW', 0.1)
+
+    @property
+    def stream(self):
+        """Return the name of the frames sent by this process.
+
+        This is renamed in a forked worker, as it numbers its own frames.
+        """
+        if self._pid != os.getpid():
+            self._pid = os.getpid()
+            self._stream = uuid4().hex[:8]
+        return self._stream
+
+    @property
+    def queue_depth(self):
+        """Return the number of sessions submitted but not yet published.
+        """
+        return self._queue.qsize()
+
+    def submit(self, instance: Session):
+        """Publish the session from the background thread.
+        """
+        with self._lock:
+            if self._worker is None:
+                self._worker = threading.Thread(target=self._work,
+                                                name='broadcaster',
+                                                daemon=True)
+                self._worker.start()
+        self._queue.put(instance)
+        submitted_sessions.inc()
+
+    def join(self):
+        """Wait until every submitted session has been published.
+        """
+        self._queue.join()
+
+    def publish(self, data: dict, ranked=True):
+        """Queue the serialized session to be sent with the next frames.
+
+        Completed sessions go to the leaderboard group, unless they aren't
+        `ranked`, as seeded sessions aren't.
+        """
+        uuid = str(data['uuid'])
+        fields = {k: v for k, v in data.items() if k != 'uuid'}
+
+        with self._lock:
+            previous = self._sent.pop(uuid, {})
+            self._sent[uuid] = fields
+            while len(self._sent) > self.max_sessions:
+                forgotten, _ = self._sent.popitem(last=False)
+                self._seq.pop(session_group(forgotten), None)
+
+            delta = {k: v for k, v in fields.items()
+                     if k not in previous or previous[k] != v}
+            if not delta:
+                return
+
+            self._add(ALL_GROUP, uuid, delta)
+            self._add(session_group(uuid), uuid, delta)
+            if ranked and fields.get('current_day', 0) >= Session.MAX_DAYS:
+                self._add(LEADERBOARD_GROUP, uuid, fields)
+
+            if self._timer is not None:
+                return
+            if self.window > 0:
+                self._timer = threading.Timer(self.window, self.flush)
+                self._timer.daemon = True
+                self._timer.start()
+                return
+
+        self.flush()
+
+    def flush(self):
+        """Send everything queued as a single frame per group.
+
+        Frames are sent while holding the lock so they go out in `seq` order.
+        """
+        with self._lock:
+            self._timer = None
+            pending = self._pending
+            self._pending = OrderedDict()
+
+            for group, sessions in pending.items():
+                self._seq[group] = self._seq.get(group, 0) + 1
+                frame = {
+                    'stream': self.stream,
+                    'seq': self._seq[group],
+                    'sessions': sessions,
+                }
+                text = dumps(frame)
+                Group(group).send({'text': text})
+
+                label = _get_group_label(group)
+                sent_frames.inc(group=label)
+                frame_bytes.observe(len(text.encode('utf-8')), group=label)
+
+    def _work(self):
+        """Serialize and publish submitted sessions forever.
+        """
+        while True:
+            instance = self._queue.get()
+            try:
+                self.publish(SessionReadSerializer(instance).data,
+                             ranked=not instance.seeded)
+            except Exception:
+                logger.exception('Could not broadcast session %s',
+                                 instance.uuid)
+            finally:
+                self._queue.task_done()
+
+    def _add(self, group, uuid, fields):
+        """Add the fields to the next frame for the group.
+        """
+        sessions = self._pending.setdefault(group, OrderedDict())
+        sessions.setdefault(uuid, {}).update(fields)
+
+
+broadcaster = Broadcaster()
+
+registry.register(Gauge(
+    'elves_broadcast_queue_depth',
+    'Sessions submitted but not yet sent to the websocket.',
+    function=lambda: broadcaster.queue_depth))
@@ -0,0 +1,119 @@
+"""Cache the session list and details between writes.
+
+Responses are cached under the current version, which is replaced whenever a
+session or day is written, so a write makes every cached response stale at
+once without having to find them. The version is replaced again once the
+write commits, so a read racing with the transaction can't keep the old data
+under the new version.
+
+Entries are kept in the `ELVES_RESPONSE_CACHE` cache, which bounds how many
+are held. Use a file-based or shared cache when running several workers, so
+a write in one worker is seen by the others.
+"""
+import threading
+
+from hashlib import md5
+from uuid import uuid4
+
+from django.conf import settings
+from django.core.cache import caches
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from .metrics import Counter, registry
+from .models import Day, Session
+
+VERSION_KEY = 'elves:version'
+
+
+class ResponseCache:
+    """Read and write cached responses, counting hits and misses.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    @property
+    def cache(self):
+        return caches[getattr(settings, 'ELVES_RESPONSE_CACHE', 'default')]
+
+    def get(self, path):
+        """Return the key for the full path under the current version, and
+        the value cached under it or None.
+
+        Pass the key to `set` to cache the response, so a response read
+        before a write commits is never cached under the version that write
+        makes.
+        """
+        key = self._get_key(path)
+        value = self.cache.get(key)
+        with self._lock:
+            if value is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+        return key, value
+
+    def set(self, key, value):
+        """Cache the value under the key returned by `get`.
+        """
+        self.cache.set(key, value)
+
+    def bump(self):
+        """Make every cached response stale, now and once committed.
+        """
+        self._new_version()
+        transaction.on_commit(self._new_version)
+
+    def stats(self):
+        """Return the hits and misses since the process started.
+        """
+        with self._lock:
+            return {'hits': self.hits, 'misses': self.misses}
+
+    def _get_key(self, path):
+        """Return the key for the path under the current version.
+        """
+        version = self.cache.get(VERSION_KEY)
+        if version is None:
+            version = self._new_version()
+        digest = md5(path.encode('utf-8')).hexdigest()
+        return 'elves:{}:{}'.format(version, digest)
+
+    def _new_version(self):
+        """Replace the version.
+
+        The version is random, so a version that has been evicted can't come
+        back and serve old entries.
+        """
+        version = uuid4().hex
+        self.cache.set(VERSION_KEY, version, None)
+        return version
+
+
+response_cache = ResponseCache()
+
+
+def _count_lookups():
+    stats = response_cache.stats()
+    return {('hit',): stats['hits'], ('miss',): stats['misses']}
+
+
+registry.register(Counter(
+    'elves_response_cache_lookups_total',
+    'Cached session list and detail lookups, by whether they were found.',
+    labels=('result',),
+    function=_count_lookups))
+
+
+@receiver(post_save, sender=Session)
+@receiver(post_delete, sender=Session)
+@receiver(post_save, sender=Day)
+@receiver(post_delete, sender=Day)
+def bump_version(sender, **kwargs):
+    """Make the cached responses stale when a session or day is written.
+    """
+    response_cache.bump()
@@ -2,14 +2,42 @@
 """
 from channels import Group
 
+from .broadcast import ALL_GROUP, LEADERBOARD_GROUP, session_group
+
 
 def ws_connect(message):
     # Add to reader group
-    Group("session").add(message.reply_channel)
+    Group(ALL_GROUP).add(message.reply_channel)
     # Accept the connection request
     message.reply_channel.send({"accept": True})
 
 
 def ws_disconnect(message):
     # Remove from reader group on clean disconnect
-    Group("session").discard(message.reply_channel)
+    Group(ALL_GROUP).discard(message.reply_channel)
+
+
+def ws_connect_session(message, uuid):
+    """Follow the updates to a single session.
+    """
+    Group(session_group(uuid)).add(message.reply_channel)
+    message.reply_channel.send({"accept": True})
+
+
+def ws_disconnect_session(message, uuid):
+    """Stop following a single session.
+    """
+    Group(session_group(uuid)).discard(message.reply_channel)
+
+
+def ws_connect_leaderboard(message):
+    """Follow sessions as they complete.
+    """
+    Group(LEADERBOARD_GROUP).add(message.reply_channel)
+    message.reply_channel.send({"accept": True})
+
+
+def ws_disconnect_leaderboard(message):
+    """Stop following completed sessions.
+    """
+    Group(LEADERBOARD_GROUP).discard(message.reply_channel)
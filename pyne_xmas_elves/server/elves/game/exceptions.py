@@ -0,0 +1,16 @@
+"""Exceptions.
+"""
+
+
+class TurnConflict(Exception):
+    """Raised when a day is played against out-of-date session state.
+
+    This happens when two turns for the same session are sent at once.
+    """
+
+    def __init__(self, session, *args, **kwargs):
+        """Generate a readable message.
+        """
+        msg = 'Session {} was updated by another turn'.format(
+            session.uuid)
+        super().__init__(msg, *args, **kwargs)
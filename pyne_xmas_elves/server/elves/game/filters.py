@@ -1,6 +1,5 @@
 """Filters for running games.
 """
-from django.db.models import Count, functions as f
 import django_filters as filters
 
 from .models import Session
@@ -20,13 +19,13 @@ class SessionFilterSet(filters.FilterSet):
 
     class Meta:
         model = Session
-        exclude = 'uuid', 'elves_start'
+        exclude = ('uuid', 'elves_start', 'created', 'day_count',
+                   'elves_remaining', 'money_total', 'final_money', 'version',
+                   'seed', 'seeded')
 
     def filter_active(self, queryset, name, value):
         """Filter the active/complete sessions.
         """
-        queryset = queryset.annotate(**{name: Count('days')})
-
         if value == 'only':
             lookup = '__'.join([name, 'lt'])
         elif value == 'complete':
@@ -0,0 +1,300 @@
+"""Drive simulated bots through the API and report latency per endpoint.
+
+By default the app is served from this process, over HTTP, against a
+scratch copy of the database:
+
+    python manage.py elves_bench --bots 16 --games 10 --output bench.json
+
+Pass `--url` to benchmark a server that is already running instead. That
+server must set ELVES_ALLOW_SEEDS to take `--seed`. Only a
+server running channels can take `--listeners`, which follow every session
+over websockets while the bots play (this needs aiohttp).
+
+The report is JSON, so it can be kept and compared across commits. Latencies
+are in milliseconds.
+"""
+import asyncio
+import json
+import random
+import socketserver
+import threading
+import time
+
+from collections import defaultdict
+from contextlib import contextmanager
+from urllib.parse import urljoin
+
+import requests
+
+from django.core.handlers.wsgi import WSGIHandler
+from django.core.management.base import BaseCommand, CommandError
+from django.core.servers.basehttp import WSGIRequestHandler, WSGIServer
+from django.test import override_settings
+
+from ...models import Session
+from ..scratch import scratch_database
+
+try:
+    import aiohttp
+except ImportError:
+    aiohttp = None
+
+CREATE_SESSION = 'POST /game/'
+PLAY_DAY = 'POST /game/{uuid}/day/'
+LIST_DAYS = 'GET /game/{uuid}/day/'
+
+# Seconds to wait for every websocket listener to connect.
+CONNECT_TIMEOUT = 30
+
+
+class Command(BaseCommand):
+    help = 'Benchmark the API with concurrent simulated bots.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--bots', type=int, default=8,
+                            help='The number of bots playing at once.')
+        parser.add_argument('--games', type=int, default=10,
+                            help='The number of games each bot plays.')
+        parser.add_argument('--seed', type=int,
+                            help='Seed the bots and the weather, to play the '
+                            'same games every run. A server given by --url '
+                            'must set ELVES_ALLOW_SEEDS.')
+        parser.add_argument('--url',
+                            help='Benchmark the server running at this URL '
+                            'instead of serving the app from here.')
+        parser.add_argument('--listeners', type=int, default=0,
+                            help='The number of websocket listeners, which '
+                            'needs --url.')
+        parser.add_argument('--output',
+                            help='Write the report to this file as well.')
+
+    def handle(self, *args, **options):
+        if options['listeners'] and not options['url']:
+            raise CommandError(
+                'Websocket listeners need --url of a server running channels')
+        if options['listeners'] and aiohttp is None:
+            raise CommandError(
+                'aiohttp must be installed to run websocket listeners')
+
+        if options['url']:
+            report = self.run(options['url'], options)
+        else:
+            with scratch_database(), override_settings(ELVES_ALLOW_SEEDS=True):
+                with serve() as url:
+                    report = self.run(url, options)
+
+        output = json.dumps(report, indent=2)
+        if options['output']:
+            with open(options['output'], 'w') as f:
+                f.write(output)
+        self.stdout.write(output)
+
+    def run(self, url, options):
+        """Play every game and return the report.
+        """
+        seeds = random.Random(options['seed'])
+        timings = [defaultdict(list) for _ in range(options['bots'])]
+        bots = [
+            threading.Thread(target=_play, args=(
+                url, options['games'], seeds.randrange(Session.MAX_SEED),
+                options['seed'] is not None, timings[i]))
+            for i in range(options['bots'])]
+
+        listeners = Listeners(url, options['listeners'])
+        listeners.start()
+
+        start = time.perf_counter()
+        for bot in bots:
+            bot.start()
+        for bot in bots:
+            bot.join()
+        elapsed = time.perf_counter() - start
+
+        merged = defaultdict(list)
+        for timing in timings:
+            for endpoint, results in timing.items():
+                merged[endpoint].extend(results)
+
+        report = {
+            'bots': options['bots'],
+            'games': options['bots'] * options['games'],
+            'seconds': round(elapsed, 3),
+            'requests': sum(len(results) for results in merged.values()),
+            'requests_per_second': round(
+                sum(len(results) for results in merged.values()) / elapsed,
+                1),
+            'endpoints': {
+                endpoint: _summarize(results, elapsed)
+                for endpoint, results in sorted(merged.items())
+            },
+        }
+        if options['listeners']:
+            report['websocket'] = listeners.stop(elapsed)
+        return report
+
+
+@contextmanager
+def serve():
+    """Serve the app over HTTP from a thread, yielding its URL.
+    """
+    server = _Server(('127.0.0.1', 0), _QuietHandler)
+    server.set_app(WSGIHandler())
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    try:
+        yield 'http://127.0.0.1:{}/'.format(server.server_port)
+    finally:
+        server.shutdown()
+        server.server_close()
+
+
+class _Server(socketserver.ThreadingMixIn, WSGIServer):
+    daemon_threads = True
+    request_queue_size = 128
+
+
+class _QuietHandler(WSGIRequestHandler):
+    def log_message(self, *args):
+        pass
+
+
+def _play(url, games, seed, seeded, timings):
+    """Play whole games as a bot, recording each request's latency.
+
+    `timings` maps the endpoint to a list of (seconds, succeeded). The bot
+    splits its elves at random, from its own seed, and seeds each session if
+    `seeded`.
+    """
+    rng = random.Random(seed)
+    http = requests.Session()
+
+    def send(endpoint, method, path, **kwargs):
+        start = time.perf_counter()
+        try:
+            response = http.request(method, urljoin(url, path), **kwargs)
+            ok = response.status_code < 400
+        except requests.RequestException:
+            response, ok = None, False
+        timings[endpoint].append((time.perf_counter() - start, ok))
+        return response if ok else None
+
+    for _ in range(games):
+        data = {'player_name': 'Benchmark'}
+        if seeded:
+            data['seed'] = rng.randrange(Session.MAX_SEED)
+        response = send(CREATE_SESSION, 'POST', 'game/', json=data)
+        if response is None:
+            continue
+
+        session = response.json()
+        path = 'game/{}/day/'.format(session['uuid'])
+        elves = session['elves_remaining']
+        for _ in range(Session.MAX_DAYS):
+            mountains = rng.randint(0, elves)
+            forest = rng.randint(0, elves - mountains)
+            response = send(PLAY_DAY, 'POST', path, json={
+                'elves_woods': elves - mountains - forest,
+                'elves_forest': forest,
+                'elves_mountains': mountains,
+            })
+            if response is None:
+                break
+            elves = response.json()['elves_returned']
+
+        send(LIST_DAYS, 'GET', path)
+
+
+def _summarize(results, elapsed):
+    """Return the throughput and latency percentiles of an endpoint.
+    """
+    latencies = sorted(seconds * 1000 for seconds, _ in results)
+
+    def percentile(p):
+        index = max(int(round(p / 100 * len(latencies))) - 1, 0)
+        return round(latencies[index], 2)
+
+    return {
+        'requests': len(results),
+        'errors': sum(1 for _, ok in results if not ok),
+        'requests_per_second': round(len(results) / elapsed, 1),
+        'p50': percentile(50),
+        'p95': percentile(95),
+        'p99': percentile(99),
+        'max': round(latencies[-1], 2),
+    }
+
+
+class Listeners:
+    """Follow every session over websockets from a background thread.
+    """
+
+    def __init__(self, url, count):
+        self.url = urljoin(url.replace('http', 'ws', 1), 'ws/')
+        self.count = count
+        self.frames = 0
+        self.bytes = 0
+
+        self._loop = None
+        self._thread = None
+        self._stopping = None
+        self._error = None
+
+    def start(self):
+        """Connect every listener, raising CommandError if they can't.
+        """
+        if not self.count:
+            return
+        ready = threading.Event()
+        self._thread = threading.Thread(target=self._run, args=(ready,),
+                                        daemon=True)
+        self._thread.start()
+
+        if not ready.wait(CONNECT_TIMEOUT):
+            raise CommandError('Timed out connecting to {}'.format(self.url))
+        if self._error is not None:
+            raise CommandError('Could not connect to {}: {}'.format(
+                self.url, self._error))
+
+    def stop(self, elapsed):
+        """Stop listening and return what was received.
+        """
+        # Give the last frames time to arrive.
+        time.sleep(1)
+        self._loop.call_soon_threadsafe(self._stopping.set_result, None)
+        self._thread.join()
+        return {
+            'listeners': self.count,
+            'frames': self.frames,
+            'bytes': self.bytes,
+            'frames_per_second': round(self.frames / elapsed, 1),
+        }
+
+    def _run(self, ready):
+        self._loop = asyncio.new_event_loop()
+        self._stopping = self._loop.create_future()
+        self._loop.run_until_complete(self._listen(ready))
+        self._loop.close()
+
+    async def _listen(self, ready):
+        async with aiohttp.ClientSession() as http:
+            try:
+                sockets = [await http.ws_connect(self.url)
+                           for _ in range(self.count)]
+            except Exception as exc:
+                self._error = exc
+                return
+            finally:
+                ready.set()
+
+            receivers = [asyncio.ensure_future(self._receive(socket))
+                         for socket in sockets]
+            await self._stopping
+            for socket in sockets:
+                await socket.close()
+            await asyncio.gather(*receivers, return_exceptions=True)
+
+    async def _receive(self, socket):
+        async for message in socket:
+            if message.type == aiohttp.WSMsgType.TEXT:
+                self.frames += 1
+                self.bytes += len(message.data)
@@ -0,0 +1,132 @@
+"""Measure how fast frames are broadcast through the channel layer.
+
+Several worker processes send frames to one group, the way the broadcaster
+in each server worker does, while this process reads them back. The layer
+must be shared between processes, so set ELVES_CHANNEL_LAYER first:
+
+    ELVES_CHANNEL_LAYER=ipc python manage.py elves_broadcast_bench --workers 4
+"""
+import json
+import multiprocessing
+import time
+
+from uuid import uuid4
+
+from channels import DEFAULT_CHANNEL_LAYER, Group, channel_layers
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from ...models import Session
+
+IN_MEMORY = 'asgiref.inmemory.ChannelLayer'
+
+
+class Command(BaseCommand):
+    help = 'Benchmark broadcasting frames from several worker processes.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--workers', type=int, default=4,
+                            help='The number of processes sending frames.')
+        parser.add_argument('--frames', type=int, default=1000,
+                            help='The number of frames each worker sends.')
+        parser.add_argument('--sessions', type=int, default=10,
+                            help='The number of sessions in each frame.')
+        parser.add_argument('--idle', type=float, default=1.0,
+                            help='Stop once nothing arrives for this long, '
+                            'in seconds, after the workers finish.')
+
+    def handle(self, *args, **options):
+        backend = settings.CHANNEL_LAYERS[DEFAULT_CHANNEL_LAYER]['BACKEND']
+        if backend == IN_MEMORY:
+            raise CommandError(
+                'The in-memory channel layer is not shared between '
+                'processes, set ELVES_CHANNEL_LAYER to ipc or redis.')
+
+        layer = channel_layers[DEFAULT_CHANNEL_LAYER].channel_layer
+        name = uuid4().hex
+        group = 'bench-{}'.format(name)
+        channel = 'bench-receive-{}'.format(name)
+        text = json.dumps(_make_frame(options['sessions']))
+
+        layer.group_add(group, channel)
+        try:
+            workers = [
+                multiprocessing.Process(
+                    target=_send_frames,
+                    args=(group, text, options['frames']))
+                for _ in range(options['workers'])]
+
+            start = time.perf_counter()
+            for worker in workers:
+                worker.start()
+            received, finished = _receive_frames(
+                layer, channel, workers, options['idle'])
+            sent_time = finished - start
+            received_time = time.perf_counter() - start - options['idle']
+        finally:
+            layer.group_discard(group, channel)
+
+        sent = options['workers'] * options['frames']
+        self.stdout.write(json.dumps({
+            'backend': backend,
+            'workers': options['workers'],
+            'frame_bytes': len(text),
+            'sent': sent,
+            'received': received,
+            'dropped': sent - received,
+            'sent_per_second': round(sent / sent_time, 1),
+            'received_per_second': round(
+                received / max(received_time, sent_time), 1),
+        }, indent=2))
+
+
+def _make_frame(sessions):
+    """Return a frame shaped like those the broadcaster sends.
+    """
+    return {
+        'stream': uuid4().hex[:8],
+        'seq': 1,
+        'sessions': {
+            str(uuid4()): {
+                'player_name': 'Benchmark',
+                'current_day': Session.MAX_DAYS // 2,
+                'elves_remaining': 10,
+                'money_made': '500.00',
+            }
+            for _ in range(sessions)
+        },
+    }
+
+
+def _send_frames(group, text, frames):
+    """Send the frame to the group from a worker process.
+    """
+    for _ in range(frames):
+        Group(group).send({'text': text})
+
+
+def _receive_frames(layer, channel, workers, idle):
+    """Count the frames received until the workers finish and go quiet.
+
+    Returns the count and the time the last worker finished.
+    """
+    received = 0
+    finished = None
+    last = time.perf_counter()
+
+    while True:
+        _, message = layer.receive([channel], block=False)
+        now = time.perf_counter()
+        if message is not None:
+            received += 1
+            last = now
+            continue
+
+        if finished is None:
+            if any(worker.is_alive() for worker in workers):
+                time.sleep(0.001)
+                continue
+            finished = last = now
+        if now - last >= idle:
+            return received, finished
+        time.sleep(0.001)
@@ -0,0 +1,149 @@
+"""Time the hot paths in elves.game.benchmarks and keep a history.
+
+Benchmarks with a number of sessions run against a scratch database, which
+grows from the smallest size to the largest:
+
+    python manage.py elves_microbench --sizes 1000,10000
+    python manage.py elves_microbench --bench Pagination --sizes 1000000
+
+Pass `--history` to compare with the last run recorded in a file and then
+record this run, one JSON line per run with the commit it was made at.
+"""
+import json
+import platform
+import subprocess
+import timeit
+
+from datetime import datetime
+from statistics import median
+
+from django.core.management.base import BaseCommand, CommandError
+
+from ...benchmarks import BENCHMARKS, SIZES
+from ..scratch import scratch_database
+
+
+class Command(BaseCommand):
+    help = 'Run the micro-benchmarks and compare them with earlier runs.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--bench',
+                            help='Only run benchmarks whose name contains '
+                            'this.')
+        parser.add_argument('--sizes', default=','.join(map(str, SIZES[:3])),
+                            help='The comma-separated numbers of sessions '
+                            'to generate, such as 1000,1000000.')
+        parser.add_argument('--repeat', type=int, default=5,
+                            help='The number of times to time each '
+                            'benchmark.')
+        parser.add_argument('--min-time', type=float, default=0.2,
+                            help='The least time in seconds that each timing '
+                            'runs the benchmark for.')
+        parser.add_argument('--history',
+                            help='Compare with the last run in this file, '
+                            'then add this run to it.')
+
+    def handle(self, *args, **options):
+        try:
+            sizes = sorted(int(size) for size in options['sizes'].split(','))
+        except ValueError:
+            raise CommandError('--sizes must be numbers separated by commas')
+
+        results = {}
+        with scratch_database():
+            for benchmark in BENCHMARKS:
+                if not hasattr(benchmark, 'params'):
+                    self.run(benchmark, results, options)
+            for size in sizes:
+                for benchmark in BENCHMARKS:
+                    if hasattr(benchmark, 'params'):
+                        self.run(benchmark, results, options, size)
+
+        previous = _load_last_run(options['history'])
+        for name, result in results.items():
+            line = '{:<50} {:>12.3f} us'.format(name, result['median'] * 1e6)
+            if name in previous:
+                line += ' {:>+8.1%}'.format(
+                    result['median'] / previous[name]['median'] - 1)
+            self.stdout.write(line)
+
+        if options['history']:
+            with open(options['history'], 'a') as f:
+                f.write(json.dumps({
+                    'date': datetime.utcnow().isoformat(),
+                    'commit': _get_commit(),
+                    'python': platform.python_version(),
+                    'results': results,
+                }) + '\n')
+
+    def run(self, benchmark, results, options, *params):
+        """Time each of the benchmark's methods, adding them to the results.
+        """
+        methods = [name for name in sorted(dir(benchmark))
+                   if name.startswith('time_')]
+        names = {
+            method: '{}.{}{}'.format(
+                benchmark.__name__, method,
+                ''.join('[{}]'.format(param) for param in params))
+            for method in methods
+        }
+        methods = [method for method in methods
+                   if not options['bench'] or options['bench'] in
+                   names[method]]
+        if not methods:
+            return
+
+        instance = benchmark()
+        instance.setup(*params)
+        for method in methods:
+            func = getattr(instance, method)
+            times = _time(lambda: func(*params), options['repeat'],
+                          options['min_time'])
+            results[names[method]] = {
+                'median': median(times),
+                'min': min(times),
+                'repeat': len(times),
+            }
+
+
+def _time(func, repeat, min_time):
+    """Return the seconds per call of each of `repeat` timings.
+
+    Each timing calls the function enough times to take at least `min_time`.
+    """
+    timer = timeit.Timer(func)
+    number = 1
+    while True:
+        elapsed = timer.timeit(number)
+        if elapsed >= min_time or number >= 10 ** 6:
+            break
+        number *= 10 if elapsed < min_time / 10 else 2
+
+    times = [elapsed / number]
+    for _ in range(repeat - 1):
+        times.append(timer.timeit(number) / number)
+    return times
+
+
+def _load_last_run(path):
+    """Return the results of the last run in the history, if any.
+    """
+    if not path:
+        return {}
+    try:
+        with open(path) as f:
+            lines = f.read().splitlines()
+    except FileNotFoundError:
+        return {}
+    return json.loads(lines[-1])['results'] if lines else {}
+
+
+def _get_commit():
+    """Return the commit being benchmarked, or None outside of git.
+    """
+    try:
+        return subprocess.check_output(
+            ['git', 'rev-parse', 'HEAD'],
+            stderr=subprocess.DEVNULL).decode('ascii').strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
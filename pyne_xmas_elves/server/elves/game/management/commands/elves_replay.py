@@ -0,0 +1,141 @@
+"""Record sessions and replay them to rerun the same workload.
+
+Recording writes each session's player, seed and turns to a JSON file:
+
+    python manage.py elves_replay record games.json
+
+Replaying plays the same sessions through the real endpoints against a
+scratch copy of the database. Sessions are created with their recorded
+seeds, so every turn gets the same weather and the same writes are made:
+
+    python manage.py elves_replay play games.json --threads 8
+"""
+import json
+import threading
+import time
+
+from django.core.management.base import BaseCommand
+from django.core.urlresolvers import reverse
+from django.db import connection
+from django.db.models import Prefetch
+from django.test import Client, override_settings
+
+from ...models import Day, Session
+from ..scratch import scratch_database
+
+TURN_FIELDS = ('elves_woods', 'elves_forest', 'elves_mountains')
+
+
+class Command(BaseCommand):
+    help = 'Record sessions to a file, or replay them from one.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('action', choices=('record', 'play'))
+        parser.add_argument('path', help='The recording to write or read.')
+        parser.add_argument('--limit', type=int,
+                            help='Record at most this many of the newest '
+                            'sessions.')
+        parser.add_argument('--threads', type=int, default=1,
+                            help='The number of threads replaying sessions.')
+
+    def handle(self, *args, **options):
+        if options['action'] == 'record':
+            self.record(options['path'], options['limit'])
+        else:
+            self.play(options['path'], options['threads'])
+
+    def record(self, path, limit=None):
+        """Write the sessions and their turns to the file.
+        """
+        sessions = Session.objects.order_by('-created').prefetch_related(
+            Prefetch('days', queryset=Day.objects.order_by('day')))
+        if limit is not None:
+            sessions = sessions[:limit]
+
+        recording = {
+            'sessions': [
+                {
+                    'player_name': session.player_name,
+                    'seed': session.seed,
+                    'days': [
+                        dict({field: getattr(day, field)
+                              for field in TURN_FIELDS},
+                             weather=day.weather)
+                        for day in session.days.all()
+                    ],
+                }
+                for session in reversed(sessions)
+            ],
+        }
+
+        with open(path, 'w') as f:
+            json.dump(recording, f, indent=2)
+        self.stdout.write('Recorded {} sessions'.format(
+            len(recording['sessions'])))
+
+    def play(self, path, threads=1):
+        """Replay the recorded sessions and report the throughput.
+        """
+        with open(path) as f:
+            sessions = json.load(f)['sessions']
+
+        with scratch_database(), override_settings(ELVES_ALLOW_SEEDS=True):
+            results = [None] * threads
+            workers = [
+                threading.Thread(target=_replay,
+                                 args=(sessions[i::threads], results, i))
+                for i in range(threads)]
+
+            start = time.perf_counter()
+            for worker in workers:
+                worker.start()
+            for worker in workers:
+                worker.join()
+            elapsed = time.perf_counter() - start
+
+        turns = sum(result['turns'] for result in results)
+        self.stdout.write(json.dumps({
+            'sessions': len(sessions),
+            'threads': threads,
+            'turns': turns,
+            'errors': sum(result['errors'] for result in results),
+            'weather_mismatches': sum(result['mismatches']
+                                      for result in results),
+            'seconds': round(elapsed, 3),
+            'turns_per_second': round(turns / elapsed, 1),
+        }, indent=2))
+
+
+def _replay(sessions, results, index):
+    """Create each session with its seed and play its recorded turns.
+
+    A session is abandoned at its first failed turn. Records the turns
+    played, the requests that failed and the turns whose weather differed
+    from the recording.
+    """
+    client = Client(SERVER_NAME='localhost')
+    result = {'turns': 0, 'errors': 0, 'mismatches': 0}
+
+    for session in sessions:
+        response = client.post(reverse('session-list'), {
+            'player_name': session['player_name'],
+            'seed': session['seed'],
+        })
+        if response.status_code != 201:
+            result['errors'] += 1
+            continue
+
+        url = reverse('session-day', kwargs={'pk': response.data['uuid']})
+        for day in session['days']:
+            response = client.post(
+                url, {field: day[field] for field in TURN_FIELDS})
+            if response.status_code != 201:
+                result['errors'] += 1
+                break
+
+            result['turns'] += 1
+            if response.data['weather'] != day['weather']:
+                result['mismatches'] += 1
+
+    connection.close()
+    results[index] = result
@@ -0,0 +1,89 @@
+"""Measure how many turns a second the storage profile can write.
+
+Threads play whole games through the day endpoint against a scratch copy of
+the database. Compare profiles by setting the environment:
+
+    python manage.py elves_storage_bench
+    ELVES_STORAGE=production python manage.py elves_storage_bench
+    ELVES_STORAGE=production ELVES_GROUP_COMMIT=0.002 \
+        python manage.py elves_storage_bench
+"""
+import json
+import os
+import threading
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.core.urlresolvers import reverse
+from django.db import connection
+from django.test import Client
+
+from ...models import Session
+from ..scratch import scratch_database
+
+
+class Command(BaseCommand):
+    help = 'Benchmark writing turns with the configured storage profile.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--threads', type=int, default=8,
+                            help='The number of threads playing turns.')
+        parser.add_argument('--games', type=int, default=20,
+                            help='The number of games each thread plays.')
+
+    def handle(self, *args, **options):
+        with scratch_database():
+            sessions = Session.objects.bulk_create(
+                Session(player_name='Benchmark')
+                for _ in range(options['threads'] * options['games']))
+            connection.close()
+
+            results = [None] * options['threads']
+            threads = [
+                threading.Thread(
+                    target=_play,
+                    args=(sessions[i::options['threads']], results, i))
+                for i in range(options['threads'])]
+
+            start = time.perf_counter()
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+            elapsed = time.perf_counter() - start
+
+        turns = sum(played for played, _ in results)
+        self.stdout.write(json.dumps({
+            'storage': os.environ.get('ELVES_STORAGE', 'default'),
+            'pragmas': settings.ELVES_SQLITE_PRAGMAS,
+            'group_commit': settings.ELVES_GROUP_COMMIT,
+            'threads': options['threads'],
+            'turns': turns,
+            'errors': sum(errors for _, errors in results),
+            'seconds': round(elapsed, 3),
+            'turns_per_second': round(turns / elapsed, 1),
+        }, indent=2))
+
+
+def _play(sessions, results, index):
+    """Play every turn of each session, keeping all the elves safe.
+
+    Records the number of turns played and failed.
+    """
+    client = Client(SERVER_NAME='localhost')
+    played = errors = 0
+    for session in sessions:
+        url = reverse('session-day', kwargs={'pk': session.uuid})
+        for _ in range(Session.MAX_DAYS):
+            response = client.post(url, {
+                'elves_woods': session.elves_start,
+                'elves_forest': 0,
+                'elves_mountains': 0,
+            })
+            if response.status_code == 201:
+                played += 1
+            else:
+                errors += 1
+    connection.close()
+    results[index] = (played, errors)
@@ -0,0 +1,79 @@
+"""Run a channels worker that finishes its messages when it's stopped.
+
+With several threads, channels' `runworker` exits as soon as it's sent
+SIGTERM, dropping the messages its threads are handling. This worker lets
+every thread finish its current message first, so the production server can
+replace workers without losing turns:
+
+    python manage.py elves_worker --threads 8
+"""
+import sys
+import time
+
+from channels import DEFAULT_CHANNEL_LAYER, channel_layers
+from channels.log import setup_logger
+from channels.management.commands import runworker
+from channels.signals import worker_process_ready
+from channels.worker import WorkerGroup
+from django.core.management.base import CommandError
+
+DRAIN_INTERVAL = 0.01
+
+
+class GracefulWorkerGroup(WorkerGroup):
+    """A WorkerGroup whose threads finish their messages on SIGTERM.
+    """
+
+    def sigterm_handler(self, signo, stack_frame):
+        """Stop every thread taking messages, exiting once they're done.
+
+        If this thread is busy, it exits once its message is handled.
+        """
+        for worker in [self] + self.workers:
+            worker.termed = True
+        if not self.in_job:
+            self.drain()
+            sys.exit(0)
+
+    def run(self):
+        super().run()
+        self.drain()
+
+    def drain(self):
+        """Wait for the threads to finish the messages they're handling.
+
+        Threads waiting for a message are left, as they take no more.
+        """
+        for thread, worker in zip(self.threads, self.workers):
+            while thread.is_alive() and worker.in_job:
+                time.sleep(DRAIN_INTERVAL)
+
+
+class Command(runworker.Command):
+    help = 'Run a worker that finishes its messages when stopped.'
+
+    def handle(self, *args, **options):
+        if options['threads'] == 1:
+            return super().handle(*args, **options)
+
+        logger = setup_logger('django.channels', options['verbosity'])
+        channel_layer = channel_layers[
+            options.get('layer', DEFAULT_CHANNEL_LAYER)]
+        if channel_layer.local_only():
+            raise CommandError('You cannot span multiple processes with the '
+                               'in-memory layer.')
+        channel_layer.router.check_default()
+
+        logger.info('Running %s threads against channel layer %s',
+                    options['threads'], channel_layer)
+        worker = GracefulWorkerGroup(
+            channel_layer=channel_layer,
+            only_channels=options.get('only_channels'),
+            exclude_channels=options.get('exclude_channels'),
+            n_threads=options['threads'])
+        worker_process_ready.send(sender=worker)
+        worker.ready()
+        try:
+            worker.run()
+        except KeyboardInterrupt:
+            pass
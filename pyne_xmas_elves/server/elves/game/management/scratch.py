@@ -0,0 +1,28 @@
+"""Run management commands against a throwaway copy of the database.
+"""
+import os
+import shutil
+import tempfile
+
+from contextlib import contextmanager
+
+from django.core.management import call_command
+from django.db import connections
+
+
+@contextmanager
+def scratch_database():
+    """Point the default database at a new, migrated SQLite file.
+
+    The file is deleted afterwards. This must be entered before the default
+    database is first connected to.
+    """
+    directory = tempfile.mkdtemp()
+    connections.databases['default']['NAME'] = os.path.join(
+        directory, 'scratch.sqlite3')
+    try:
+        call_command('migrate', verbosity=0)
+        yield
+    finally:
+        connections.close_all()
+        shutil.rmtree(directory)
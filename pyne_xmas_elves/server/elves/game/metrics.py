@@ -0,0 +1,204 @@
+"""Collect metrics and render them in the Prometheus text format.
+
+Metrics are kept in memory by each process, so with several workers each
+scrape of `/metrics` reports the worker that answered it. Scrape the workers
+separately, or compare rates rather than totals.
+
+Define a metric once, at module level, and register it:
+
+    turns = registry.register(Counter(
+        'elves_turns_total', 'Turns played.', labels=('weather',)))
+    turns.inc(weather='good')
+
+A metric can also read its values from a function when it's rendered, which
+returns the value or, with labels, a dict of label values to values.
+"""
+import threading
+
+from collections import OrderedDict
+
+CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+
+
+class Metric:
+    """A named metric holding a value for each set of label values.
+    """
+
+    type = 'untyped'
+
+    def __init__(self, name, documentation, labels=(), function=None):
+        self.name = name
+        self.documentation = documentation
+        self.labels = tuple(labels)
+        self.function = function
+
+        self._lock = threading.Lock()
+        self._values = OrderedDict()
+
+    def get(self, **labels):
+        """Return the value for the label values.
+        """
+        with self._lock:
+            return self._values.get(self._get_key(labels), 0)
+
+    def render(self):
+        """Return the metric's lines in the text format.
+        """
+        lines = [
+            '# HELP {} {}'.format(self.name, _escape(self.documentation)),
+            '# TYPE {} {}'.format(self.name, self.type),
+        ]
+        for suffix, labels, value in self.samples():
+            lines.append('{}{}{} {}'.format(
+                self.name, suffix, _format_labels(labels),
+                _format_value(value)))
+        return '\n'.join(lines)
+
+    def samples(self):
+        """Yield the suffix, labels and value of each sample.
+        """
+        if self.function is not None:
+            values = self.function()
+            if not self.labels:
+                values = {(): values}
+        else:
+            with self._lock:
+                values = OrderedDict(self._values)
+
+        for key, value in values.items():
+            yield '', list(zip(self.labels, key)), value
+
+    def _get_key(self, labels):
+        """Return the label values in order, checking every label is set.
+        """
+        if set(labels) != set(self.labels):
+            raise ValueError('{} takes the labels {}, not {}'.format(
+                self.name, ', '.join(self.labels), ', '.join(labels)))
+        return tuple(str(labels[label]) for label in self.labels)
+
+
+class Counter(Metric):
+    """A value that only goes up.
+    """
+
+    type = 'counter'
+
+    def inc(self, amount=1, **labels):
+        key = self._get_key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+
+class Gauge(Metric):
+    """A value that can go up and down.
+
+    Gauges usually read their value from a function.
+    """
+
+    type = 'gauge'
+
+    def set(self, value, **labels):
+        key = self._get_key(labels)
+        with self._lock:
+            self._values[key] = value
+
+
+class Histogram(Metric):
+    """Count observations into cumulative buckets, with their sum.
+    """
+
+    type = 'histogram'
+
+    def __init__(self, name, documentation, labels=(),
+                 buckets=LATENCY_BUCKETS):
+        super().__init__(name, documentation, labels)
+        self.buckets = tuple(sorted(buckets)) + (float('inf'),)
+
+    def observe(self, value, **labels):
+        key = self._get_key(labels)
+        with self._lock:
+            counts, total = self._values.get(
+                key, ([0] * len(self.buckets), 0))
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    counts[i] += 1
+            self._values[key] = (counts, total + value)
+
+    def get(self, **labels):
+        """Return the number of observations and their sum.
+        """
+        with self._lock:
+            counts, total = self._values.get(
+                self._get_key(labels), ([0] * len(self.buckets), 0))
+            return counts[-1], total
+
+    def samples(self):
+        with self._lock:
+            values = [(key, list(counts), total)
+                      for key, (counts, total) in self._values.items()]
+
+        for key, counts, total in values:
+            labels = list(zip(self.labels, key))
+            for bound, count in zip(self.buckets, counts):
+                yield '_bucket', labels + [('le', _format_value(bound))], count
+            yield '_sum', labels, total
+            yield '_count', labels, counts[-1]
+
+
+class Registry:
+    """Hold the metrics to render together.
+    """
+
+    def __init__(self):
+        self._metrics = OrderedDict()
+
+    def register(self, metric: Metric):
+        """Add the metric, returning it.
+        """
+        if metric.name in self._metrics:
+            raise ValueError('{} is already registered'.format(metric.name))
+        self._metrics[metric.name] = metric
+        return metric
+
+    def render(self):
+        """Return every metric in the text format.
+        """
+        return ''.join(metric.render() + '\n'
+                       for metric in self._metrics.values())
+
+
+def _escape(value):
+    return value.replace('\\', r'\\').replace('\n', r'\n')
+
+
+def _format_labels(labels):
+    if not labels:
+        return ''
+    return '{{{}}}'.format(','.join(
+        '{}="{}"'.format(name, _escape(value).replace('"', r'\"'))
+        for name, value in labels))
+
+
+def _format_value(value):
+    if value == float('inf'):
+        return '+Inf'
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+registry = Registry()
+
+request_seconds = registry.register(Histogram(
+    'elves_request_seconds',
+    'Time taken to respond to API requests, including rendering.',
+    labels=('view', 'action', 'method')))
+request_queries = registry.register(Histogram(
+    'elves_request_queries',
+    'Database queries made by each API request.',
+    labels=('view', 'action', 'method'),
+    buckets=(1, 2, 3, 5, 10, 20, 50, 100)))
+request_query_seconds = registry.register(Histogram(
+    'elves_request_query_seconds',
+    'Time each API request spent in database queries.',
+    labels=('view', 'action', 'method')))
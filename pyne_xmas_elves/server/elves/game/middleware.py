@@ -0,0 +1,79 @@
+"""Middleware for the Elf Game.
+"""
+import time
+
+from functools import partial
+
+from django.db.backends.utils import CursorWrapper
+
+from .metrics import request_queries, request_query_seconds, request_seconds
+from .profiling import wrap_cursors
+
+
+class CountedCursor(CursorWrapper):
+    """Record how long each query run through the cursor takes.
+    """
+
+    def __init__(self, cursor, db, durations):
+        super().__init__(cursor, db)
+        self.durations = durations
+
+    def execute(self, sql, params=None):
+        start = time.perf_counter()
+        try:
+            return super().execute(sql, params)
+        finally:
+            self.durations.append(time.perf_counter() - start)
+
+    def executemany(self, sql, param_list):
+        start = time.perf_counter()
+        try:
+            return super().executemany(sql, param_list)
+        finally:
+            self.durations.append(time.perf_counter() - start)
+
+
+class MetricsMiddleware:
+    """Time each API request and count the database queries it makes.
+
+    Requests are labelled with their viewset and action, so only requests to
+    the API's viewsets are recorded. Queries are counted and timed by wrapping
+    the connection's cursors, without keeping them in its query log. With group
+    commit, a turn's writes are counted against the request that commits
+    them.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        durations = []
+        restore = wrap_cursors(partial(CountedCursor, durations=durations))
+        start = time.perf_counter()
+
+        try:
+            response = self.get_response(request)
+        finally:
+            elapsed = time.perf_counter() - start
+            restore()
+
+        labels = getattr(request, '_metrics_labels', None)
+        if labels is not None:
+            request_seconds.observe(elapsed, **labels)
+            request_queries.observe(len(durations), **labels)
+            request_query_seconds.observe(sum(durations), **labels)
+        return response
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        """Label the request with the viewset and action it's routed to.
+        """
+        actions = getattr(view_func, 'actions', None)
+        if actions is None:
+            return None
+
+        request._metrics_labels = {
+            'view': view_func.cls.__name__,
+            'action': actions.get(request.method.lower(), 'unknown'),
+            'method': request.method,
+        }
+        return None
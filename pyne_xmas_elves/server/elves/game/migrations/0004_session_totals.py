@@ -0,0 +1,63 @@
+# -*- coding: utf-8 -*-
+from __future__ import unicode_literals
+
+from decimal import Decimal
+
+from django.db import migrations, models
+
+
+def backfill_totals(apps, schema_editor):
+    """Calculate the running totals from the days already played.
+
+    Historical models don't carry the properties on Day, so the game rules are
+    repeated here.
+    """
+    Session = apps.get_model('game', 'Session')
+
+    for session in Session.objects.prefetch_related('days'):
+        days = sorted(session.days.all(), key=lambda d: d.day)
+
+        session.day_count = len(days)
+        session.elves_remaining = session.elves_start
+        session.money_total = Decimal('0.00')
+
+        for day in days:
+            session.money_total += day.elves_woods * Decimal('10.00')
+            if day.weather == 'good':
+                session.money_total += (
+                    day.elves_forest * Decimal('20.00') +
+                    day.elves_mountains * Decimal('50.00'))
+                session.elves_remaining = (
+                    day.elves_woods + day.elves_forest + day.elves_mountains)
+            else:
+                session.elves_remaining = day.elves_woods + day.elves_forest
+
+        session.save(update_fields=['day_count', 'elves_remaining',
+                                    'money_total'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('game', '0003_auto_20171203_2035'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='session',
+            name='day_count',
+            field=models.PositiveIntegerField(default=0, help_text='The number of days played so far.'),
+        ),
+        migrations.AddField(
+            model_name='session',
+            name='elves_remaining',
+            field=models.PositiveIntegerField(blank=True, default=12, help_text='The elves available for the next day.'),
+            preserve_default=False,
+        ),
+        migrations.AddField(
+            model_name='session',
+            name='money_total',
+            field=models.DecimalField(decimal_places=2, default=Decimal('0.00'), help_text='The total money made across all days played.', max_digits=10),
+        ),
+        migrations.RunPython(backfill_totals, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,39 @@
+# -*- coding: utf-8 -*-
+from __future__ import unicode_literals
+
+from datetime import timedelta
+
+from django.db import migrations, models
+import django.utils.timezone
+
+
+def spread_created(apps, schema_editor):
+    """Give existing sessions distinct timestamps in their stored order.
+
+    Cursor pagination pages by `created`, so ties would fall back to an
+    offset.
+    """
+    Session = apps.get_model('game', 'Session')
+
+    uuids = list(Session.objects.values_list('uuid', flat=True))
+    start = django.utils.timezone.now() - timedelta(microseconds=len(uuids))
+
+    for i, uuid in enumerate(uuids):
+        Session.objects.filter(uuid=uuid).update(
+            created=start + timedelta(microseconds=i))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('game', '0004_session_totals'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='session',
+            name='created',
+            field=models.DateTimeField(db_index=True, default=django.utils.timezone.now, editable=False),
+        ),
+        migrations.RunPython(spread_created, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,28 @@
+# -*- coding: utf-8 -*-
+from __future__ import unicode_literals
+
+from django.db import migrations, models
+
+
+def backfill_final_money(apps, schema_editor):
+    """Enter the sessions that have already completed onto the leaderboard.
+    """
+    Session = apps.get_model('game', 'Session')
+    Session.objects.filter(day_count__gte=10).update(
+        final_money=models.F('money_total'))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('game', '0005_session_created'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='session',
+            name='final_money',
+            field=models.DecimalField(blank=True, db_index=True, decimal_places=2, help_text='The total money made, set once the session completes.', max_digits=10, null=True),
+        ),
+        migrations.RunPython(backfill_final_money, migrations.RunPython.noop),
+    ]
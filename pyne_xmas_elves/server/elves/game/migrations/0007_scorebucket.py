@@ -0,0 +1,36 @@
+# -*- coding: utf-8 -*-
+from __future__ import unicode_literals
+
+from django.db import migrations, models
+
+
+def build_histogram(apps, schema_editor):
+    """Count the sessions that have already completed by score.
+    """
+    Session = apps.get_model('game', 'Session')
+    ScoreBucket = apps.get_model('game', 'ScoreBucket')
+
+    scores = Session.objects.filter(final_money__isnull=False).values(
+        'final_money').annotate(sessions=models.Count('uuid'))
+    ScoreBucket.objects.bulk_create(
+        ScoreBucket(money=score['final_money'], sessions=score['sessions'])
+        for score in scores)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('game', '0006_session_final_money'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ScoreBucket',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('money', models.DecimalField(decimal_places=2, help_text='The final money made by the sessions in this bucket.', max_digits=10, unique=True)),
+                ('sessions', models.PositiveIntegerField(default=0, help_text='The number of completed sessions with this score.')),
+            ],
+        ),
+        migrations.RunPython(build_histogram, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,33 @@
+# -*- coding: utf-8 -*-
+from __future__ import unicode_literals
+
+from django.db import migrations, models
+import django.utils.timezone
+
+
+def backfill_modified(apps, schema_editor):
+    """Date the existing sessions from when they were created.
+    """
+    Session = apps.get_model('game', 'Session')
+    Session.objects.update(modified=models.F('created'))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('game', '0007_scorebucket'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='session',
+            name='version',
+            field=models.PositiveIntegerField(default=0, editable=False, help_text='Goes up by one every time the session changes.'),
+        ),
+        migrations.AddField(
+            model_name='session',
+            name='modified',
+            field=models.DateTimeField(default=django.utils.timezone.now, editable=False, help_text='When the session last changed.'),
+        ),
+        migrations.RunPython(backfill_modified, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,31 @@
+# -*- coding: utf-8 -*-
+from __future__ import unicode_literals
+
+from django.db import migrations, models
+import elves.game.models
+
+
+def seed_sessions(apps, schema_editor):
+    """Give each existing session its own seed.
+    """
+    Session = apps.get_model('game', 'Session')
+
+    for uuid in Session.objects.values_list('uuid', flat=True):
+        Session.objects.filter(uuid=uuid).update(
+            seed=elves.game.models.new_seed())
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('game', '0008_session_version'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='session',
+            name='seed',
+            field=models.PositiveIntegerField(default=elves.game.models.new_seed, help_text='Seeds the weather, so a session replayed with the same seed has the same weather each day.'),
+        ),
+        migrations.RunPython(seed_sessions, migrations.RunPython.noop),
+    ]
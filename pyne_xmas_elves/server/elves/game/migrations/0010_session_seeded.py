@@ -0,0 +1,19 @@
+# -*- coding: utf-8 -*-
+from __future__ import unicode_literals
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('game', '0009_session_seed'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='session',
+            name='seeded',
+            field=models.BooleanField(default=False, editable=False, help_text='Whether the seed was chosen when the session was created. Seeded sessions know their weather, so they are never ranked.'),
+        ),
+    ]
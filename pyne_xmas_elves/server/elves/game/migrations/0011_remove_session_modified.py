@@ -0,0 +1,18 @@
+# -*- coding: utf-8 -*-
+from __future__ import unicode_literals
+
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('game', '0010_session_seeded'),
+    ]
+
+    operations = [
+        migrations.RemoveField(
+            model_name='session',
+            name='modified',
+        ),
+    ]
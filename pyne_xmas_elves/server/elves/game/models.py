@@ -5,8 +5,12 @@ import random
 from decimal import Decimal
 from uuid import uuid4
 
-from django.core import exceptions
-from django.db import models
+from django.db import IntegrityError, models, transaction
+from django.db.models.signals import post_delete
+from django.dispatch import receiver
+from django.utils import timezone
+
+from .exceptions import TurnConflict
 
 
 class DayQuerySet(models.QuerySet):
@@ -16,18 +20,37 @@ class DayQuerySet(models.QuerySet):
     def create(self, *args, **kwargs):
         """Set a default day based on the previous days.
 
-        The front-end user shouldn't be able to determine the day.
+        The front-end user shouldn't be able to determine the day. A day
+        passed in must be the session's next day, as the running totals
+        count the days in order: ValueError is raised for a later day, and
+        TurnConflict for one already played. The totals are updated in the
+        same transaction, and TurnConflict is raised if the session was
+        changed since it was loaded.
         """
-        if 'day' not in kwargs:
-            kwargs['day'] = self.filter(
-                session=kwargs['session']).aggregate(
-                    latest=models.functions.Coalesce(models.Max('day'), 0)
-            )['latest'] + 1
+        session = kwargs['session']
+        next_day = session.day_count + 1
+
+        day = kwargs.setdefault('day', next_day)
+        if day > next_day:
+            raise ValueError('Day {} of session {} must be played before day '
+                             '{}'.format(next_day, session.uuid, day))
+        if day < next_day:
+            raise TurnConflict(session)
 
         if 'weather' not in kwargs:
-            kwargs['weather'] = random.choice(['good', 'good', 'snow'])
+            kwargs['weather'] = session.get_weather(kwargs['day'])
 
-        return super().create(*args, **kwargs)
+        day = self.model(*args, **kwargs)
+        try:
+            with transaction.atomic(using=self.db):
+                session.record_day(day)
+                day.save(force_insert=True, using=self.db)
+        except IntegrityError:
+            session.refresh_from_db(fields=['day_count', 'elves_remaining',
+                                            'money_total', 'final_money',
+                                            'version'])
+            raise TurnConflict(session)
+        return day
 
     def get_current_day(self):
         """Return the highest day.
@@ -35,6 +58,47 @@ class DayQuerySet(models.QuerySet):
         return self.latest().day
 
 
+class SessionQuerySet(models.QuerySet):
+    """QuerySet for reading game sessions.
+    """
+
+    def bulk_create(self, objs, *args, **kwargs):
+        """Start each new session with all of its elves available.
+
+        `Session.save` isn't called for bulk inserts.
+        """
+        objs = list(objs)
+        for obj in objs:
+            if obj.elves_remaining is None:
+                obj.elves_remaining = obj.elves_start
+        return super().bulk_create(objs, *args, **kwargs)
+
+    def with_totals(self):
+        """Load only the columns needed to describe a session's progress.
+
+        The totals are maintained by `DayQuerySet.create`, so no days are
+        queried and a page of sessions is read in a single query.
+        """
+        return self.only('uuid', 'player_name', 'created', 'day_count',
+                         'elves_remaining', 'money_total', 'final_money',
+                         'version', 'seed', 'seeded')
+
+    def leaderboard(self):
+        """Return the completed sessions, highest money made first.
+
+        Only completed sessions have a `final_money`, so this reads the top of
+        its index instead of scanning every session.
+        """
+        return self.filter(final_money__isnull=False).order_by(
+            '-final_money', 'created')
+
+
+def new_seed():
+    """Return a random seed for a session's weather.
+    """
+    return random.randint(0, Session.MAX_SEED)
+
+
 class Session(models.Model):
     """Model an individual game session.
 
@@ -43,43 +107,150 @@ class Session(models.Model):
     """
 
     MAX_DAYS = 10
+    MAX_SEED = 2 ** 31 - 1
+    WEATHER = ('good', 'good', 'snow')
+
+    # The running totals of the days played, written by `record_day`.
+    TOTALS = ('day_count', 'elves_remaining', 'money_total', 'final_money')
+
+    objects = SessionQuerySet.as_manager()
 
     uuid = models.UUIDField(primary_key=True, unique=True, default=uuid4)
 
     elves_start = models.PositiveIntegerField(default=12)
     player_name = models.CharField(max_length=200)
+    created = models.DateTimeField(default=timezone.now, db_index=True,
+                                   editable=False)
+
+    day_count = models.PositiveIntegerField(
+        default=0, help_text='The number of days played so far.')
+    elves_remaining = models.PositiveIntegerField(
+        blank=True, help_text='The elves available for the next day.')
+    money_total = models.DecimalField(
+        default=Decimal('0.00'), max_digits=10, decimal_places=2,
+        help_text='The total money made across all days played.')
+    final_money = models.DecimalField(
+        null=True, blank=True, db_index=True, max_digits=10, decimal_places=2,
+        help_text='The total money made, set once the session completes.')
+
+    seed = models.PositiveIntegerField(
+        default=new_seed,
+        help_text='Seeds the weather, so a session replayed with the same '
+        'seed has the same weather each day.')
+    seeded = models.BooleanField(
+        default=False, editable=False,
+        help_text='Whether the seed was chosen when the session was created. '
+        'Seeded sessions know their weather, so they are never ranked.')
+
+    version = models.PositiveIntegerField(
+        default=0, editable=False,
+        help_text='Goes up by one every time the session changes.')
 
     def __str__(self):
         """Return a str representation.
         """
-        return 'Day {s.current_day} - with {s.current_elves} remaining'.format(
-            s=self)
+        return ('Day {s.current_day} - with {s.elves_remaining} '
+                'remaining').format(s=self)
+
+    def save(self, *args, **kwargs):
+        """Start a new session with all of its elves available.
+
+        Saving an existing session bumps its version. Unless they're named in
+        `update_fields`, the running totals are left to `record_day`, so a
+        session loaded before a turn was played can't overwrite them with
+        stale values.
+        """
+        if self.elves_remaining is None:
+            self.elves_remaining = self.elves_start
+
+        if self._state.adding:
+            super().save(*args, **kwargs)
+            return
+
+        update_fields = kwargs.get('update_fields')
+        if update_fields is None:
+            deferred = self.get_deferred_fields()
+            update_fields = [
+                field.name for field in self._meta.concrete_fields
+                if not (field.primary_key or field.name in self.TOTALS or
+                        field.attname in deferred)]
+        kwargs['update_fields'] = set(update_fields) | {'version'}
+
+        self.version = models.F('version') + 1
+        super().save(*args, **kwargs)
+        self.refresh_from_db(fields=['version'])
 
     @property
     def current_day(self):
         """Return the current day.
+        """
+        return self.day_count
 
-        This runs an extra query.
+    @property
+    def money_made(self):
+        """Return the total money made for a session.
         """
-        return self.days.get_current_day()
+        return self.money_total
 
     @property
-    def elves_remaining(self):
-        """Return the current remaining elves.
+    def etag(self):
+        """Return an ETag that changes whenever the session does.
+        """
+        return '"{s.day_count}.{s.version}"'.format(s=self)
+
+    def get_weather(self, day):
+        """Return the weather for the day.
 
-        This runs an extra query.
+        Good weather is twice as likely as snow. The weather only depends on
+        the seed and the day.
         """
-        try:
-            last_day = self.days.latest()
-        except exceptions.ObjectDoesNotExist:
-            return self.elves_start
-        return last_day.elves_returned
+        rng = random.Random('{}:{}'.format(self.seed, day))
+        return rng.choice(self.WEATHER)
 
-    @property
-    def money_made(self):
-        """Return the total money made for a session.
+    def get_rank(self):
+        """Return how the completed session ranks against all others.
+
+        Returns None while the session is still being played, and for seeded
+        sessions, which are never ranked.
+        """
+        if self.final_money is None:
+            return None
+        return ScoreBucket.objects.rank(self.final_money)
+
+    def record_day(self, day):
+        """Add the outcome of the passed-in day to the running totals.
+
+        The update only applies if no other day was recorded since this
+        session was loaded, otherwise TurnConflict is raised. This must be
+        called inside the transaction that creates the day.
+
+        Recording the final day enters the session onto the leaderboard and
+        the score histogram, unless it was seeded.
         """
-        return sum(d.money_made for d in self.days.all())
+        day_count = self.day_count + 1
+        money_total = self.money_total + day.money_made
+        final_money = None
+        if day_count >= self.MAX_DAYS and not self.seeded:
+            final_money = money_total
+
+        updated = Session.objects.filter(
+            pk=self.pk, day_count=self.day_count).update(
+                day_count=day_count,
+                elves_remaining=day.elves_returned,
+                money_total=money_total,
+                final_money=final_money,
+                version=models.F('version') + 1)
+        if not updated:
+            raise TurnConflict(self)
+
+        if final_money is not None:
+            ScoreBucket.objects.add(final_money)
+
+        self.day_count = day_count
+        self.elves_remaining = day.elves_returned
+        self.money_total = money_total
+        self.final_money = final_money
+        self.version += 1
 
 
 class Day(models.Model):
@@ -168,3 +339,84 @@ class Day(models.Model):
         elves_mountains = self.elves_mountains * self.MOUNTAINS_VALUE
 
         return elves_woods + elves_forest + elves_mountains
+
+
+class ScoreBucketQuerySet(models.QuerySet):
+    """QuerySet managing the histogram of final scores.
+    """
+
+    def add(self, money):
+        """Count a completed session with the given final money.
+        """
+        bucket, created = self.get_or_create(money=money,
+                                             defaults={'sessions': 1})
+        if not created:
+            self.filter(pk=bucket.pk).update(
+                sessions=models.F('sessions') + 1)
+
+    def remove(self, money):
+        """Stop counting a completed session with the given final money.
+
+        An emptied bucket is kept, as it doesn't change any ranks and a
+        concurrent `add` may already have found it.
+        """
+        self.filter(money=money, sessions__gt=0).update(
+            sessions=models.F('sessions') - 1)
+
+    def rank(self, money):
+        """Return the rank, player count and percentile beaten for money.
+
+        This runs a single query over the buckets, of which there is at most
+        one per distinct score.
+        """
+        totals = self.aggregate(
+            players=models.Sum('sessions'),
+            higher=models.Sum(models.Case(
+                models.When(money__gt=money, then='sessions'),
+                default=0)),
+            lower=models.Sum(models.Case(
+                models.When(money__lt=money, then='sessions'),
+                default=0)))
+
+        players = totals['players'] or 0
+        return {
+            'rank': (totals['higher'] or 0) + 1,
+            'players': players,
+            'percentile': (
+                round(100 * (totals['lower'] or 0) / players, 2)
+                if players else 0.0),
+        }
+
+
+class ScoreBucket(models.Model):
+    """The number of completed sessions that finished with a given score.
+
+    Money is always made in multiples of £10, so the histogram is exact and
+    its size is bounded by the range of scores rather than the number of
+    sessions.
+    """
+
+    objects = ScoreBucketQuerySet.as_manager()
+
+    money = models.DecimalField(
+        unique=True, max_digits=10, decimal_places=2,
+        help_text='The final money made by the sessions in this bucket.')
+    sessions = models.PositiveIntegerField(
+        default=0,
+        help_text='The number of completed sessions with this score.')
+
+    def __str__(self):
+        """The string representation.
+        """
+        return '{s.sessions} sessions made £{s.money}'.format(s=self)
+
+
+@receiver(post_delete, sender=Session)
+def remove_score(sender, instance, **kwargs):
+    """Take a deleted session out of the score histogram.
+
+    Seeded and unfinished sessions have no final money and were never
+    counted.
+    """
+    if instance.final_money is not None:
+        ScoreBucket.objects.remove(instance.final_money)
@@ -5,14 +5,57 @@ class ResultsPaginator(pagination.LimitOffsetPagination):
     """
     Only return the results themselves and no extra structure.
 
-    Works like LimitOffsetPagination.
+    Works like LimitOffsetPagination. The total count is never returned, so
+    the extra COUNT query is skipped.
     """
 
     default_limit = 100
     max_limit = 200
 
+    def paginate_queryset(self, queryset, request, view=None):
+        """
+        Return the requested slice of queryset without counting it.
+        """
+        self.limit = self.get_limit(request)
+        if self.limit is None:
+            return None
+
+        self.offset = self.get_offset(request)
+        self.request = request
+        return list(queryset[self.offset:self.offset + self.limit])
+
     def get_paginated_response(self, data):
         """
         Return the results in data.
         """
         return response.Response(data)
+
+
+class LeaderboardPaginator(ResultsPaginator):
+    """
+    Return the top sessions as a bare list.
+    """
+
+    default_limit = 10
+    max_limit = 100
+
+
+class CursorResultsPaginator(pagination.CursorPagination):
+    """
+    Page through the newest sessions first using a cursor.
+
+    Each page is found using the `created` index rather than an offset, so
+    deep pages cost the same as the first and new sessions don't shift pages
+    that have already been read.
+    """
+
+    ordering = '-created'
+    page_size = 100
+    page_size_query_param = 'limit'
+    max_page_size = 200
+
+    def get_ordering(self, request, queryset, view):
+        """
+        Always order by the indexed column, ignoring any ordering filter.
+        """
+        return (self.ordering,)
@@ -0,0 +1,19 @@
+"""Parsers for request bodies beyond the REST framework defaults.
+"""
+from rest_framework import exceptions, parsers
+
+from .renderers import msgpack
+
+
+class MessagePackParser(parsers.BaseParser):
+    """Parse `application/msgpack` request bodies.
+    """
+
+    media_type = 'application/msgpack'
+
+    def parse(self, stream, media_type=None, parser_context=None):
+        try:
+            return msgpack.unpackb(stream.read(), raw=False)
+        except Exception as exc:
+            raise exceptions.ParseError(
+                'MessagePack parse error - {}'.format(exc))
@@ -0,0 +1,304 @@
+"""Profile single API requests on demand.
+
+Staff can profile a request by passing `profile` in the query string or an
+`X-Profile` header. The response is unchanged apart from an `X-Profile`
+header with the time spent in the request, its SQL, its serializers and
+rendering, in milliseconds:
+
+    X-Profile: {"total": 12.1, "sql": 3.4, "queries": 2, "serializer": 5.2,
+                "render": 1.3, "other": 2.2}
+
+The serializer time doesn't include the queries run while serializing. The
+value picks what else is done:
+
+* `summary` - only the header, the default.
+* `stats` - run the request under cProfile and return the breakdown and the
+  slowest functions in place of the response.
+* `trace` - run the request under cProfile and write a Chrome trace and the
+  cProfile stats to `ELVES_PROFILE_DIR`, naming the files in an
+  `X-Profile-Trace` header. Open the trace in chrome://tracing or Perfetto.
+
+Writes made for the request by another thread, such as with group commit,
+aren't seen.
+"""
+import cProfile
+import io
+import json
+import os
+import pstats
+import threading
+import time
+
+from contextlib import contextmanager
+from functools import partial
+from uuid import uuid4
+
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, connections
+from django.db.backends.utils import CursorWrapper
+from django.http import HttpResponse
+
+MODES = ('summary', 'stats', 'trace')
+
+STATS_LIMIT = 30
+
+
+def get_profile_mode(request):
+    """Return the profiling mode asked for by the request, or None.
+    """
+    mode = request.query_params.get('profile',
+                                    request.META.get('HTTP_X_PROFILE'))
+    if mode is None:
+        return None
+    return mode if mode in MODES else 'summary'
+
+
+def wrap_cursors(wrapper):
+    """Wrap the cursors this thread's connection makes in `wrapper`.
+
+    Queries are only logged if they already were, such as with DEBUG on.
+    Returns a function that puts the connection back; wrappers nest, so
+    restore them in the reverse order.
+    """
+    db = connections[DEFAULT_DB_ALIAS]
+    forced = db.force_debug_cursor
+    previous = vars(db).get('make_debug_cursor')
+    inner = None
+    if db.queries_logged:
+        inner = db.make_debug_cursor
+
+    def make_debug_cursor(cursor):
+        if inner is not None:
+            cursor = inner(cursor)
+        return wrapper(cursor, db)
+
+    db.force_debug_cursor = True
+    db.make_debug_cursor = make_debug_cursor
+
+    def restore():
+        db.force_debug_cursor = forced
+        if previous is None:
+            del db.make_debug_cursor
+        else:
+            db.make_debug_cursor = previous
+
+    return restore
+
+
+class Profile:
+    """Time the SQL, serializer and render spans of a request.
+
+    Queries on this thread's connection are timed while the profile is
+    running. In the `stats` and `trace` modes the calls are profiled as well.
+    """
+
+    def __init__(self, name, mode='summary'):
+        self.name = name
+        self.mode = mode
+        self.spans = []
+
+        self.profiler = cProfile.Profile() if mode != 'summary' else None
+        self._start = None
+        self._stop = None
+        self._restore = None
+
+    def start(self):
+        """Start timing and run this thread's queries through the profile.
+        """
+        self._restore = wrap_cursors(partial(ProfiledCursor, profile=self))
+
+        self._start = time.perf_counter()
+        if self.profiler is not None:
+            self.profiler.enable()
+
+    def stop(self):
+        """Stop timing and restore the connection.
+        """
+        if self.profiler is not None:
+            self.profiler.disable()
+        self._stop = time.perf_counter()
+
+        self._restore()
+
+    @contextmanager
+    def span(self, category, name, **args):
+        """Time the block as a span in the category.
+        """
+        start = time.perf_counter()
+        try:
+            yield args
+        finally:
+            self.spans.append((category, name, start,
+                               time.perf_counter() - start, args))
+
+    def wrap(self, obj, method, category):
+        """Time every call to the object's method as a span.
+        """
+        func = getattr(obj, method)
+        name = '{}.{}'.format(type(obj).__name__, method)
+
+        def wrapper(*args, **kwargs):
+            with self.span(category, name):
+                return func(*args, **kwargs)
+
+        setattr(obj, method, wrapper)
+
+    def breakdown(self):
+        """Return the milliseconds spent in each category.
+
+        SQL run inside a serializer span is counted as SQL, not serializer.
+        """
+        sql = [s for s in self.spans if s[0] == 'sql']
+        total = self._stop - self._start
+        seconds = {
+            'sql': sum(s[3] for s in sql),
+            'serializer': sum(
+                duration - sum(q[3] for q in sql
+                               if start <= q[2] < start + duration)
+                for category, _, start, duration, _ in self.spans
+                if category == 'serializer'),
+            'render': sum(s[3] for s in self.spans if s[0] == 'render'),
+        }
+        seconds['other'] = total - sum(seconds.values())
+
+        result = {'total': round(total * 1000, 3), 'queries': len(sql)}
+        result.update(
+            (key, round(value * 1000, 3)) for key, value in seconds.items())
+        return result
+
+    def functions(self, limit=STATS_LIMIT):
+        """Return the functions taking the most cumulative time.
+        """
+        stats = pstats.Stats(self.profiler, stream=io.StringIO())
+        stats.sort_stats('cumulative')
+
+        functions = []
+        for key in stats.fcn_list[:limit]:
+            _, calls, total, cumulative, _ = stats.stats[key]
+            functions.append({
+                'function': '{}:{}({})'.format(*key),
+                'calls': calls,
+                'total': round(total * 1000, 3),
+                'cumulative': round(cumulative * 1000, 3),
+            })
+        return functions
+
+    def chrome_trace(self):
+        """Return the spans in the Chrome trace event format.
+        """
+        pid, tid = os.getpid(), threading.get_ident()
+        spans = [('request', self.name, self._start,
+                  self._stop - self._start, {})] + self.spans
+        return {
+            'displayTimeUnit': 'ms',
+            'traceEvents': [
+                {
+                    'name': name,
+                    'cat': category,
+                    'ph': 'X',
+                    'ts': round((start - self._start) * 1e6, 3),
+                    'dur': round(duration * 1e6, 3),
+                    'pid': pid,
+                    'tid': tid,
+                    'args': args,
+                }
+                for category, name, start, duration, args in spans
+            ],
+        }
+
+    def save(self):
+        """Write the Chrome trace and the cProfile stats, returning their
+        paths.
+        """
+        os.makedirs(settings.ELVES_PROFILE_DIR, exist_ok=True)
+
+        base = os.path.join(settings.ELVES_PROFILE_DIR, '{}-{}-{}'.format(
+            time.strftime('%Y%m%d-%H%M%S'), self.name.replace('.', '-'),
+            uuid4().hex[:6]))
+        with open(base + '.trace.json', 'w') as f:
+            json.dump(self.chrome_trace(), f)
+        self.profiler.dump_stats(base + '.prof')
+        return base + '.trace.json', base + '.prof'
+
+    def finish(self, response):
+        """Return the response to send for the profiled request.
+        """
+        breakdown = self.breakdown()
+        if self.mode == 'stats':
+            response = HttpResponse(
+                json.dumps({'breakdown': breakdown,
+                            'functions': self.functions()}),
+                content_type='application/json')
+        elif self.mode == 'trace':
+            response['X-Profile-Trace'] = ' '.join(self.save())
+
+        response['X-Profile'] = json.dumps(breakdown)
+        return response
+
+
+class ProfiledCursor(CursorWrapper):
+    """Time queries as SQL spans of the profile.
+    """
+
+    def __init__(self, cursor, db, profile):
+        super().__init__(cursor, db)
+        self.profile = profile
+
+    def execute(self, sql, params=None):
+        with self.profile.span('sql', _get_statement(sql), sql=sql):
+            return super().execute(sql, params)
+
+    def executemany(self, sql, param_list):
+        with self.profile.span('sql', _get_statement(sql), sql=sql):
+            return super().executemany(sql, param_list)
+
+
+class ProfiledViewMixin:
+    """Profile requests from staff that ask for it.
+
+    The profile starts once the user is authenticated and covers handling
+    and rendering the response.
+    """
+
+    _profile = None
+
+    def initial(self, request, *args, **kwargs):
+        super().initial(request, *args, **kwargs)
+
+        mode = get_profile_mode(request)
+        if mode is not None and request.user.is_staff:
+            self._profile = Profile('{}.{}'.format(
+                type(self).__name__, self.action), mode)
+            self._profile.start()
+
+    def dispatch(self, request, *args, **kwargs):
+        try:
+            response = super().dispatch(request, *args, **kwargs)
+            if self._profile is not None and hasattr(response, 'render'):
+                with self._profile.span('render', type(self).__name__):
+                    response.render()
+        finally:
+            if self._profile is not None:
+                self._profile.stop()
+
+        if self._profile is None:
+            return response
+        return self._profile.finish(response)
+
+    def get_serializer(self, *args, **kwargs):
+        return self.profile_serializer(
+            super().get_serializer(*args, **kwargs))
+
+    def profile_serializer(self, serializer):
+        """Time the serializer's validation and output, when profiling.
+        """
+        if self._profile is not None:
+            self._profile.wrap(serializer, 'is_valid', 'serializer')
+            self._profile.wrap(serializer, 'to_representation', 'serializer')
+        return serializer
+
+
+def _get_statement(sql):
+    """Return the kind of statement, such as SELECT.
+    """
+    return sql.split(None, 1)[0].upper() if sql.strip() else 'SQL'
@@ -2,10 +2,11 @@
 """
 from rest_framework import routers
 
-from .views import SessionViewSet
+from .views import LeaderboardViewSet, SessionViewSet
 
 
 router = routers.SimpleRouter()
 
 router.register(r'game', SessionViewSet)
+router.register(r'leaderboard', LeaderboardViewSet, base_name='leaderboard')
 urlpatterns = router.urls
@@ -1,8 +1,18 @@
 from channels.routing import route
-from .consumers import ws_connect, ws_disconnect
+from .consumers import (ws_connect, ws_connect_leaderboard, ws_connect_session,
+                        ws_disconnect, ws_disconnect_leaderboard,
+                        ws_disconnect_session)
 
+SESSION_PATH = r'^/ws/game/(?P<uuid>[0-9a-fA-F-]{36})/$'
+LEADERBOARD_PATH = r'^/ws/leaderboard/$'
 
 CHANNEL_ROUTING = [
+    route('websocket.connect', ws_connect_session, path=SESSION_PATH),
+    route('websocket.disconnect', ws_disconnect_session, path=SESSION_PATH),
+    route('websocket.connect', ws_connect_leaderboard, path=LEADERBOARD_PATH),
+    route('websocket.disconnect', ws_disconnect_leaderboard,
+          path=LEADERBOARD_PATH),
+    # Every other path follows all sessions
     route('websocket.connect', ws_connect),
     route('websocket.disconnect', ws_disconnect)
 ]
@@ -1,10 +1,26 @@
 """Serializers for Sessions and Days.
+
+The `Read` serializers build the same output as their ModelSerializers
+without the per-field machinery, for the endpoints that list many rows.
 """
+from collections import OrderedDict
+from decimal import Context, Decimal
+
+from django.conf import settings
 from rest_framework import serializers
 
 from .models import Day, Session
 from .validators import positive_number
 
+MONEY_PLACES = Decimal('0.01')
+MONEY_CONTEXT = Context(prec=10)
+
+
+def format_money(value):
+    """Format money as DecimalField(max_digits=10, decimal_places=2) does.
+    """
+    return '{:f}'.format(value.quantize(MONEY_PLACES, context=MONEY_CONTEXT))
+
 
 class SessionSerializer(serializers.ModelSerializer):
     """A single game session.
@@ -13,13 +29,20 @@ class SessionSerializer(serializers.ModelSerializer):
     with your elf allocation.
     """
 
-    current_day = serializers.IntegerField(read_only=True)
+    current_day = serializers.IntegerField(source='day_count', read_only=True)
     elves_remaining = serializers.IntegerField(read_only=True)
-    money_made = serializers.DecimalField(read_only=True, max_digits=10,
-                                          decimal_places=2)
+    money_made = serializers.DecimalField(source='money_total', read_only=True,
+                                          max_digits=10, decimal_places=2)
+    seed = serializers.IntegerField(
+        write_only=True, required=False, min_value=0,
+        max_value=Session.MAX_SEED,
+        help_text='Seeds the weather. Sessions with the same seed have the '
+        'same weather each day, so seeded sessions are never ranked. Only '
+        'staff can seed a session, unless ELVES_ALLOW_SEEDS is set.')
 
     class Meta:
-        exclude = 'elves_start',
+        exclude = ('elves_start', 'created', 'day_count', 'money_total',
+                   'final_money', 'version', 'seeded')
         model = Session
         extra_kwargs = {
             'uuid': {
@@ -27,6 +50,113 @@ class SessionSerializer(serializers.ModelSerializer):
             },
         }
 
+    def validate_seed(self, value):
+        """Only accept a seed for a new session, from staff if required.
+
+        Knowing the seed tells a player the weather of every day.
+        """
+        if self.instance is not None:
+            raise serializers.ValidationError(
+                'The seed can only be set when a session is created')
+
+        request = self.context.get('request')
+        is_staff = request is not None and request.user.is_staff
+        if not (is_staff or settings.ELVES_ALLOW_SEEDS):
+            raise serializers.ValidationError(
+                'Only staff can seed a session')
+        return value
+
+    def validate(self, attrs):
+        """Mark a session seeded when its seed was chosen.
+        """
+        if 'seed' in attrs:
+            attrs['seeded'] = True
+        return attrs
+
+
+class DayBatchSerializer(serializers.Serializer):
+    """Identify the session a day in a batch of turns is played against.
+
+    The elf allocation itself is validated by `DaySerializer`.
+    """
+
+    session = serializers.UUIDField(
+        help_text='The uuid of the session to play the day against.')
+
+
+class RankSerializer(serializers.Serializer):
+    """How a completed session ranks against every other completed session.
+    """
+
+    rank = serializers.IntegerField(read_only=True)
+    players = serializers.IntegerField(read_only=True)
+    percentile = serializers.FloatField(
+        read_only=True,
+        help_text='The percentage of players that made less money.')
+
+
+class SessionRankSerializer(SessionSerializer):
+    """A single game session, including its rank once it has completed.
+    """
+
+    rank = serializers.SerializerMethodField()
+
+    def get_rank(self, instance):
+        """Return the rank, or None while the session is being played.
+
+        A rank already looked up can be passed in the `rank` context.
+        """
+        if 'rank' in self.context:
+            rank = self.context['rank']
+        else:
+            rank = instance.get_rank()
+        return None if rank is None else RankSerializer(rank).data
+
+
+class SessionReadSerializer(serializers.BaseSerializer):
+    """A single game session, read-only.
+
+    Renders exactly as SessionSerializer.
+    """
+
+    def to_representation(self, instance):
+        return OrderedDict((
+            ('uuid', str(instance.uuid)),
+            ('current_day', instance.day_count),
+            ('elves_remaining', instance.elves_remaining),
+            ('money_made', format_money(instance.money_total)),
+            ('player_name', instance.player_name),
+        ))
+
+
+class SessionRankReadSerializer(serializers.BaseSerializer):
+    """A single game session with its rank, read-only.
+
+    Renders exactly as SessionRankSerializer.
+    """
+
+    def to_representation(self, instance):
+        if 'rank' in self.context:
+            rank = self.context['rank']
+        else:
+            rank = instance.get_rank()
+
+        if rank is not None:
+            rank = OrderedDict((
+                ('rank', rank['rank']),
+                ('players', rank['players']),
+                ('percentile', float(rank['percentile'])),
+            ))
+
+        return OrderedDict((
+            ('uuid', str(instance.uuid)),
+            ('current_day', instance.day_count),
+            ('elves_remaining', instance.elves_remaining),
+            ('money_made', format_money(instance.money_total)),
+            ('rank', rank),
+            ('player_name', instance.player_name),
+        ))
+
 
 class DaySerializer(serializers.ModelSerializer):
     """Manage an individual Day.
@@ -75,7 +205,7 @@ class DaySerializer(serializers.ModelSerializer):
     def _validate_day(self):
         """Validate we have not run for more than 10 days.
         """
-        if self.context['session'].days.count() == Session.MAX_DAYS:
+        if self.context['session'].day_count >= Session.MAX_DAYS:
             raise serializers.ValidationError({
                 'day': 'Your elf game has completed at {} turns!'.format(
                     Session.MAX_DAYS)
@@ -99,3 +229,22 @@ class DaySerializer(serializers.ModelSerializer):
                 'elves_forest': message,
                 'elves_mountains': message
             })
+
+
+class DayReadSerializer(serializers.BaseSerializer):
+    """An individual Day, read-only.
+
+    Renders exactly as DaySerializer.
+    """
+
+    def to_representation(self, instance):
+        return OrderedDict((
+            ('elves_sent', instance.elves_sent),
+            ('elves_returned', instance.elves_returned),
+            ('money_made', format_money(instance.money_made)),
+            ('day', instance.day),
+            ('weather', instance.weather),
+            ('elves_woods', instance.elves_woods),
+            ('elves_forest', instance.elves_forest),
+            ('elves_mountains', instance.elves_mountains),
+        ))
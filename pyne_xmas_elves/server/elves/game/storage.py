@@ -0,0 +1,128 @@
+"""Tune how turns are written to SQLite.
+
+`ELVES_SQLITE_PRAGMAS` are run on every new connection, which is how the
+production storage profile switches on WAL mode.
+
+With `ELVES_GROUP_COMMIT` set to a window in seconds, turns played at the same
+time by different threads share one transaction. The first turn to arrive
+waits for the window, then writes every turn that has joined it, each in its
+own savepoint, and commits once for all of them.
+"""
+import threading
+import time
+
+from django.conf import settings
+from django.db import transaction
+from django.db.backends.signals import connection_created
+from django.dispatch import receiver
+
+
+@receiver(connection_created)
+def set_pragmas(sender, connection, **kwargs):
+    """Run the configured pragmas on a new SQLite connection.
+    """
+    if connection.vendor != 'sqlite':
+        return
+
+    pragmas = getattr(settings, 'ELVES_SQLITE_PRAGMAS', {})
+    with connection.cursor() as cursor:
+        for name, value in pragmas.items():
+            cursor.execute('PRAGMA {} = {}'.format(name, value))
+
+
+class _Write:
+    """A write waiting for its group to commit.
+
+    `wake` is set once the write is done, or when it should lead the next
+    group.
+    """
+
+    def __init__(self, func):
+        self.func = func
+        self.wake = threading.Event()
+        self.done = False
+        self.result = None
+        self.error = None
+
+
+class GroupCommit:
+    """Run concurrent writes in a single transaction.
+
+    Each group holds at most `max_size` writes. Once it has committed, the
+    next waiting write leads the following group, so no caller waits for
+    more than one group besides its own.
+    """
+
+    def __init__(self, max_size=100):
+        self.max_size = max_size
+
+        self._lock = threading.Lock()
+        self._pending = []
+        self._leading = False
+
+    @property
+    def window(self):
+        return getattr(settings, 'ELVES_GROUP_COMMIT', 0)
+
+    def run(self, func):
+        """Call func in a group transaction and return its result once the
+        group has committed.
+
+        Exceptions raised by func are re-raised here, without affecting the
+        rest of the group. With no window, func is called straight away.
+        """
+        if self.window <= 0:
+            return func()
+
+        write = _Write(func)
+        with self._lock:
+            self._pending.append(write)
+            if not self._leading:
+                self._leading = True
+                write.wake.set()
+
+        write.wake.wait()
+        if not write.done:
+            self._lead()
+
+        if write.error is not None:
+            raise write.error
+        return write.result
+
+    def _lead(self):
+        """Commit the next group, then pass the lead on.
+        """
+        time.sleep(self.window)
+        with self._lock:
+            group = self._pending[:self.max_size]
+            self._pending = self._pending[self.max_size:]
+
+        self._commit(group)
+
+        with self._lock:
+            if self._pending:
+                self._pending[0].wake.set()
+            else:
+                self._leading = False
+
+    def _commit(self, group):
+        """Write the group in one transaction and wake its callers.
+        """
+        try:
+            with transaction.atomic():
+                for write in group:
+                    try:
+                        with transaction.atomic():
+                            write.result = write.func()
+                    except Exception as exc:
+                        write.error = exc
+        except Exception as exc:
+            for write in group:
+                write.error = exc
+        finally:
+            for write in group:
+                write.done = True
+                write.wake.set()
+
+
+group_commit = GroupCommit()
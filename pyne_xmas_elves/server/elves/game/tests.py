@@ -1,14 +1,54 @@
 """Tests for the Elf Game Session Logic.
 """
+import asyncio
+import json
+import os
+import shutil
+import tempfile
+import threading
+import time
+
+from collections import defaultdict
+from datetime import timedelta
 from decimal import Decimal
-from unittest.mock import patch
-
+from fractions import Fraction
+from importlib import import_module, util
+from unittest.mock import Mock, patch
+
+from channels import Group
+from channels.test import ChannelTestCase, WSClient
+from django.apps import apps
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.management import call_command
 from django.core.urlresolvers import reverse
-from django.test import TestCase
-
+from django.db import (DEFAULT_DB_ALIAS, connection, connections,
+                       transaction)
+from django.db.backends.utils import CursorDebugWrapper
+from django.test import TestCase, TransactionTestCase, override_settings
+from django.utils import timezone
+from django.utils.http import http_date
+
+from pyne_xmas_elves.client import (BaseGame, aio, simulator, solver,
+                                    tournament)
+from pyne_xmas_elves.client.exceptions import (ServerResponseException,
+                                               WrongElvesException)
 from rest_framework import status, test
-
-from .models import Session, Day
+from rest_framework.renderers import JSONRenderer
+
+from .benchmarks import BENCHMARKS, generate_sessions
+from .broadcast import Broadcaster, frame_bytes, sent_frames
+from .cache import response_cache
+from .exceptions import TurnConflict
+from .management.commands.elves_worker import GracefulWorkerGroup
+from .metrics import (Counter, Histogram, Registry, request_queries,
+                      request_seconds)
+from .models import Day, ScoreBucket, Session
+from .renderers import FastJSONRenderer, msgpack
+from .serializers import (DayReadSerializer, DaySerializer,
+                          SessionRankReadSerializer, SessionRankSerializer,
+                          SessionReadSerializer, SessionSerializer)
+from .storage import GroupCommit, set_pragmas
 
 
 class SessionTestCase(TestCase):
@@ -52,18 +92,108 @@ class SessionTestCase(TestCase):
                                  elves_mountains=4)
         self.assertEqual(day.day, 3)
 
+    @patch('elves.game.models.Session.get_weather')
+    def test_create_day_updates_totals(self, get_weather):
+        """Creating a day updates the stored session totals.
+        """
+        get_weather.return_value = 'snow'
+        Day.objects.create(session=self._get_session(),
+                           elves_woods=4,
+                           elves_forest=4,
+                           elves_mountains=3)
+
+        session = self._get_session()
+        self.assertEqual(session.day_count, 3)
+        self.assertEqual(session.elves_remaining, 8)
+        self.assertEqual(session.money_total, Decimal('290.00'))
+
+    def test_new_session_totals(self):
+        """A new session starts with all of its elves and no money.
+        """
+        session = Session.objects.create(player_name='Jane Smith',
+                                         elves_start=15)
+
+        self.assertEqual(session.day_count, 0)
+        self.assertEqual(session.elves_remaining, 15)
+        self.assertEqual(session.money_total, Decimal('0.00'))
+
+    def test_backfill_totals(self):
+        """The migration rebuilds the session totals from existing days.
+        """
+        Session.objects.update(day_count=0, elves_remaining=0,
+                               money_total=Decimal('0.00'))
+
+        migration = import_module('elves.game.migrations.0004_session_totals')
+        migration.backfill_totals(apps, None)
+
+        session = self._get_session()
+        self.assertEqual(session.day_count, 2)
+        self.assertEqual(session.elves_remaining, 11)
+        self.assertEqual(session.money_total, Decimal('250.00'))
+
+    def test_create_stale_session(self):
+        """A day played against out-of-date session state is rejected.
+        """
+        stale = self._get_session()
+        Day.objects.create(session=self._get_session(),
+                           elves_woods=11,
+                           elves_forest=0,
+                           elves_mountains=0)
+
+        with self.assertRaises(TurnConflict):
+            Day.objects.create(session=stale,
+                               elves_woods=11,
+                               elves_forest=0,
+                               elves_mountains=0)
+
+        self.assertEqual(self._get_session().days.count(), 3)
+        self.assertEqual(self._get_session().day_count, 3)
+
+    def test_create_duplicate_day(self):
+        """Playing a day that already exists is rejected.
+        """
+        session = self._get_session()
+
+        with self.assertRaises(TurnConflict):
+            Day.objects.create(session=session,
+                               elves_woods=11,
+                               elves_forest=0,
+                               elves_mountains=0,
+                               day=2)
+
+        self.assertEqual(session.day_count, 2)
+        self.assertEqual(self._get_session().day_count, 2)
+
     def test_create_with_day(self):
-        """Can pass the day in manually.
+        """Can pass the next day in manually.
         """
         day = Day.objects.create(session=self._get_session(),
                                  elves_woods=4,
                                  elves_forest=4,
                                  elves_mountains=4,
-                                 day=4)
-        self.assertEqual(day.day, 4)
+                                 day=3)
+        self.assertEqual(day.day, 3)
+
+    def test_create_skipping_day(self):
+        """A day can't be played before the days leading up to it.
+        """
+        with self.assertRaises(ValueError):
+            Day.objects.create(session=self._get_session(),
+                               elves_woods=4,
+                               elves_forest=4,
+                               elves_mountains=3,
+                               day=4)
+
+        self.assertFalse(self._get_session().days.filter(day=4).exists())
+        day = Day.objects.create(session=self._get_session(),
+                                 elves_woods=4,
+                                 elves_forest=4,
+                                 elves_mountains=3)
+        self.assertEqual(day.day, 3)
+        self.assertEqual(self._get_session().day_count, 3)
 
-    @patch('elves.game.models.random')
-    def test_create_with_weather(self, random):
+    @patch('elves.game.models.Session.get_weather')
+    def test_create_with_weather(self, get_weather):
         """Can pass weather in manually.
         """
         day = Day.objects.create(session=self._get_session(),
@@ -72,33 +202,40 @@ class SessionTestCase(TestCase):
                                  elves_mountains=4,
                                  weather='good')
         self.assertEqual(day.weather, 'good')
-        self.assertFalse(random.choice.called)
+        self.assertFalse(get_weather.called)
 
-    @patch('elves.game.models.random')
-    def test_random_weather(self, random):
-        """Creating a day sets the weather at random.
+    def test_random_weather(self):
+        """Creating a day sets the weather from the session's seed.
         """
-        random.choice.return_value = 'good'
-        day = Day.objects.create(session=self._get_session(),
+        session = self._get_session()
+        day = Day.objects.create(session=session,
                                  elves_woods=4,
                                  elves_forest=4,
                                  elves_mountains=4)
 
-        self.assertEqual(day.weather, 'good')
-        self.assertEqual(random.choice.call_count, 1)
+        self.assertEqual(day.weather, session.get_weather(3))
 
-    @patch('elves.game.models.random')
-    def test_usually_good_weather(self, random):
-        """The random generator should have a 2:1 chance for good weather.
+    def test_usually_good_weather(self):
+        """The weather should have a 2:1 chance of being good.
         """
-        random.choice.return_value = 'snow'
-        Day.objects.create(session=self._get_session(),
-                           elves_woods=4,
-                           elves_forest=4,
-                           elves_mountains=4)
+        session = self._get_session()
+        weather = [session.get_weather(day) for day in range(3000)]
+
+        self.assertAlmostEqual(weather.count('good') / len(weather), 2 / 3,
+                               delta=0.03)
+
+    def test_seeded_weather(self):
+        """The weather each day only depends on the session's seed.
+        """
+        session = self._get_session()
+        replay = Session(seed=session.seed)
+        other = Session(seed=session.seed + 1)
 
-        self.assertListEqual(random.choice.call_args[0][0],
-                             ['good', 'good', 'snow'])
+        days = range(1, 31)
+        self.assertListEqual([session.get_weather(day) for day in days],
+                             [replay.get_weather(day) for day in days])
+        self.assertNotEqual([session.get_weather(day) for day in days],
+                            [other.get_weather(day) for day in days])
 
     def test_elves_sent(self):
         """Elves sent is the total sent to forest, woods + mountains.
@@ -136,6 +273,44 @@ class SessionTestCase(TestCase):
 
         self.assertEqual(day.money_made, woods)
 
+    def test_save_bumps_version(self):
+        """Saving a session changes its version.
+        """
+        session = self._get_session()
+        session.player_name = 'Stephen Jones'
+        session.save(update_fields=['player_name'])
+
+        session = self._get_session()
+        self.assertEqual(session.version, 3)
+
+    @patch('elves.game.models.Session.get_weather')
+    def test_save_keeps_totals(self, get_weather):
+        """Saving a session loaded before a turn keeps the turn's totals.
+        """
+        get_weather.return_value = 'good'
+        stale = self._get_session()
+        Day.objects.create(session=self._get_session(),
+                           elves_woods=11,
+                           elves_forest=0,
+                           elves_mountains=0)
+
+        stale.player_name = 'Stephen Jones'
+        stale.save()
+
+        session = self._get_session()
+        self.assertEqual(session.player_name, 'Stephen Jones')
+        self.assertEqual(session.day_count, 3)
+        self.assertEqual(session.elves_remaining, 11)
+        self.assertEqual(session.money_total, Decimal('360.00'))
+        self.assertEqual(session.version, 4)
+        self.assertEqual(stale.version, 4)
+
+        day = Day.objects.create(session=session,
+                                 elves_woods=11,
+                                 elves_forest=0,
+                                 elves_mountains=0)
+        self.assertEqual(day.day, 4)
+
     def _get_session(self):
         """Get the active session.
         """
@@ -177,6 +352,11 @@ class GameTestCase(test.APITestCase):
 
     SESSION_ID = 'fd5b2d8e-78f9-40b3-9d6a-3c39a17ba106'
 
+    def setUp(self):
+        """Start without any cached responses.
+        """
+        response_cache.cache.clear()
+
     def test_list_response_code(self):
         """The session-list returns HTTP 200.
         """
@@ -192,6 +372,77 @@ class GameTestCase(test.APITestCase):
         self.assertEqual(len(response.data), 2)
         self.assertEqual(response.data[0]['player_name'], 'Steve Jones')
 
+    def test_list_query_count(self):
+        """Listing a page of sessions costs one query, however large the page.
+        """
+        Session.objects.bulk_create(
+            Session(player_name='Player {}'.format(i), elves_remaining=12)
+            for i in range(150))
+
+        with self.assertNumQueries(1):
+            response = self.client.get(reverse('session-list'), {'limit': 5})
+        self.assertEqual(len(response.data), 5)
+
+        with self.assertNumQueries(1):
+            response = self.client.get(reverse('session-list'),
+                                       {'limit': 200})
+        self.assertEqual(len(response.data), 152)
+
+    def test_list_offset(self):
+        """The offset skips sessions from the start of the list.
+        """
+        response = self.client.get(reverse('session-list'), {'offset': 1})
+
+        self.assertEqual(len(response.data), 1)
+        self.assertEqual(response.data[0]['player_name'], 'John Smith')
+
+    def test_cursor_first_page(self):
+        """Passing an empty cursor pages through the newest sessions first.
+        """
+        response = self.client.get(reverse('session-list'), {'cursor': ''})
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertIsNone(response.data['previous'])
+        self.assertIsNone(response.data['next'])
+        self.assertListEqual(
+            [s['player_name'] for s in response.data['results']],
+            ['John Smith', 'Steve Jones'])
+
+    def test_cursor_next_page(self):
+        """The next link continues from the last session on the page.
+        """
+        response = self.client.get(reverse('session-list'),
+                                   {'cursor': '', 'limit': 1})
+        self.assertEqual(response.data['results'][0]['player_name'],
+                         'John Smith')
+
+        Session.objects.create(player_name='Jane Smith')
+
+        response = self.client.get(response.data['next'])
+        self.assertEqual(len(response.data['results']), 1)
+        self.assertEqual(response.data['results'][0]['player_name'],
+                         'Steve Jones')
+
+    def test_cursor_query_count(self):
+        """A cursor page costs one query and no count.
+        """
+        response = self.client.get(reverse('session-list'),
+                                   {'cursor': '', 'limit': 1})
+
+        with self.assertNumQueries(1):
+            self.client.get(response.data['next'])
+
+    def test_retrieve_query_count(self):
+        """Retrieving a session costs one query.
+        """
+        with self.assertNumQueries(1):
+            response = self.client.get(
+                reverse('session-detail', kwargs={'pk': self.SESSION_ID}))
+
+        self.assertEqual(response.data['current_day'], 2)
+        self.assertEqual(response.data['elves_remaining'], 11)
+        self.assertEqual(response.data['money_made'], '250.00')
+
     def test_active_sessions(self):
         """Return only active sessions - less than 10 days played.
         """
@@ -228,6 +479,73 @@ class GameTestCase(test.APITestCase):
         self.assertEqual(response.data['elves_remaining'], 12)
         self.assertEqual(response.data['money_made'], '0.00')
 
+    def test_new_session_seed(self):
+        """Staff can seed a new session to replay a game's weather.
+        """
+        self.client.force_authenticate(User.objects.create_user(
+            'staff', is_staff=True))
+        response = self.client.post(reverse('session-list'),
+                                    {'player_name': 'James Smith', 'seed': 1})
+
+        self.assertNotIn('seed', response.data)
+        session = Session.objects.get(pk=response.data['uuid'])
+        self.assertEqual(session.seed, 1)
+        self.assertTrue(session.seeded)
+
+        response = self.client.post(reverse('session-list'),
+                                    {'player_name': 'James Smith', 'seed': -1})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_new_session_seed_staff_only(self):
+        """Players can't choose the weather by seeding a session.
+        """
+        response = self.client.post(reverse('session-list'),
+                                    {'player_name': 'James Smith', 'seed': 1})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn('seed', response.data)
+
+        with override_settings(ELVES_ALLOW_SEEDS=True):
+            response = self.client.post(
+                reverse('session-list'),
+                {'player_name': 'James Smith', 'seed': 1})
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+
+    def test_update_seed(self):
+        """The seed can't be changed once the session is created.
+        """
+        self.client.force_authenticate(User.objects.create_user(
+            'staff', is_staff=True))
+        url = reverse('session-detail', kwargs={'pk': self.SESSION_ID})
+
+        response = self.client.patch(url, {'seed': 5})
+
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn('seed', response.data)
+        session = Session.objects.get(pk=self.SESSION_ID)
+        self.assertEqual(session.seed, 1)
+        self.assertFalse(session.seeded)
+
+    def test_seeded_not_ranked(self):
+        """A seeded session doesn't reach the leaderboard or the scores.
+        """
+        buckets = list(ScoreBucket.objects.values_list('money', 'sessions'))
+        session = Session.objects.create(player_name='Seeded', seed=1,
+                                         seeded=True)
+        for _ in range(Session.MAX_DAYS):
+            session.days.create(session=session, elves_woods=12,
+                                elves_forest=0, elves_mountains=0)
+
+        session.refresh_from_db()
+        self.assertEqual(session.day_count, Session.MAX_DAYS)
+        self.assertIsNone(session.final_money)
+        self.assertListEqual(
+            list(ScoreBucket.objects.values_list('money', 'sessions')),
+            buckets)
+        response = self.client.get(
+            reverse('session-rank', kwargs={'pk': session.uuid}))
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn('seed', response.data)
+
     def test_list_days_200(self):
         """The list of days returns HTTP 200.
         """
@@ -275,6 +593,138 @@ class GameTestCase(test.APITestCase):
         self.assertEqual(day['elves_returned'], 11)
         self.assertEqual(day['money_made'], '60.00')
 
+    def test_list_ordering(self):
+        """The sessions can be ordered by their fields.
+        """
+        response = self.client.get(reverse('session-list'),
+                                   {'ordering': 'player_name'})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual([session['player_name'] for session in response.data],
+                         ['John Smith', 'Steve Jones'])
+
+        response = self.client.get(reverse('session-list'),
+                                   {'ordering': '-money_total'})
+        self.assertEqual([session['player_name'] for session in response.data],
+                         ['John Smith', 'Steve Jones'])
+
+    def test_browsable_api(self):
+        """The sessions and days can be browsed as HTML.
+        """
+        for url in (reverse('session-list'),
+                    reverse('session-detail', kwargs={'pk': self.SESSION_ID}),
+                    reverse('session-day', kwargs={'pk': self.SESSION_ID})):
+            response = self.client.get(url, {'ordering': 'player_name'},
+                                       HTTP_ACCEPT='text/html')
+            self.assertEqual(response.status_code, status.HTTP_200_OK, url)
+            self.assertTrue(response['Content-Type'].startswith('text/html'))
+
+    def test_docs(self):
+        """The API docs can be generated.
+        """
+        response = self.client.get('/docs/')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+    def test_retrieve_etag(self):
+        """Retrieving a session sends its ETag, but no Last-Modified date.
+        """
+        response = self.client.get(
+            reverse('session-detail', kwargs={'pk': self.SESSION_ID}))
+
+        self.assertEqual(response['ETag'], '"2.2"')
+        self.assertFalse(response.has_header('Last-Modified'))
+
+    def test_retrieve_not_modified(self):
+        """A client with the current session gets 304 without the body.
+        """
+        url = reverse('session-detail', kwargs={'pk': self.SESSION_ID})
+
+        with self.assertNumQueries(1):
+            response = self.client.get(url, HTTP_IF_NONE_MATCH='"2.2"')
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+        self.assertEqual(response['ETag'], '"2.2"')
+
+    def test_retrieve_modified(self):
+        """Playing a turn changes the ETag.
+        """
+        url = reverse('session-detail', kwargs={'pk': self.SESSION_ID})
+        Day.objects.create(session=self._get_session(),
+                           elves_woods=11,
+                           elves_forest=0,
+                           elves_mountains=0)
+
+        response = self.client.get(url, HTTP_IF_NONE_MATCH='"2.2"')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response['ETag'], '"3.3"')
+
+    def test_turns_in_same_second(self):
+        """Polling with If-Modified-Since sees a turn played in the same
+        second as the last one.
+        """
+        url = reverse('session-day', kwargs={'pk': self.SESSION_ID})
+        turn = {'elves_woods': 11, 'elves_forest': 0, 'elves_mountains': 0}
+        second = timezone.now().replace(microsecond=0)
+
+        with patch('django.utils.timezone.now',
+                   return_value=second + timedelta(milliseconds=100)):
+            self.client.post(url, turn)
+        response = self.client.get(url)
+        self.assertEqual(len(response.data), 3)
+
+        with patch('django.utils.timezone.now',
+                   return_value=second + timedelta(milliseconds=900)):
+            self.client.post(url, turn)
+        response = self.client.get(
+            url, HTTP_IF_MODIFIED_SINCE=http_date(second.timestamp()))
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(len(response.data), 4)
+
+    def test_retrieve_completed_etag(self):
+        """A completed session's ETag changes with its rank.
+        """
+        url = reverse('session-detail',
+                      kwargs={'pk': 'b299778c-b7c2-4ffb-8403-d6dfe6923793'})
+
+        response = self.client.get(url)
+        self.assertEqual(response['ETag'], '"10.10.1.1"')
+
+        ScoreBucket.objects.add(Decimal('1000.00'))
+        response_cache.bump()
+        response = self.client.get(url, HTTP_IF_NONE_MATCH='"10.10.1.1"')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response['ETag'], '"10.10.2.2"')
+        self.assertEqual(response.data['rank']['rank'], 2)
+
+    def test_day_list_not_modified(self):
+        """Polling the days of an unchanged session returns 304.
+        """
+        response = self.client.get(
+            reverse('session-day', kwargs={'pk': self.SESSION_ID}),
+            HTTP_IF_NONE_MATCH='"2.2"')
+
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+
+    def test_day_list_since(self):
+        """Only the days after `since` are returned.
+        """
+        url = reverse('session-day', kwargs={'pk': self.SESSION_ID})
+
+        response = self.client.get(url, {'since': 1})
+        self.assertListEqual([day['day'] for day in response.data], [2])
+
+        response = self.client.get(url, {'since': 2})
+        self.assertListEqual(response.data, [])
+
+    def test_day_list_since_invalid(self):
+        """`since` must be a day number.
+        """
+        response = self.client.get(
+            reverse('session-day', kwargs={'pk': self.SESSION_ID}),
+            {'since': 'yesterday'})
+
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn('since', response.data)
+
     def test_create_day_201(self):
         """Add a day returns 201.
         """
@@ -289,11 +739,11 @@ class GameTestCase(test.APITestCase):
         self.assertEqual(response.status_code, status.HTTP_201_CREATED,
                          msg=response.data)
 
-    @patch('elves.game.models.random')
-    def test_create_day_data(self, random):
+    @patch('elves.game.models.Session.get_weather')
+    def test_create_day_data(self, get_weather):
         """Creating a day with the number of elves to send.
         """
-        random.choice.return_value = 'good'
+        get_weather.return_value = 'good'
 
         response = self.client.post(
             reverse('session-day', kwargs={'pk': self.SESSION_ID}),
@@ -316,11 +766,11 @@ class GameTestCase(test.APITestCase):
                 'weather': 'good',
             })
 
-    @patch('elves.game.models.random')
-    def test_create_send_all_elves(self, random):
+    @patch('elves.game.models.Session.get_weather')
+    def test_create_send_all_elves(self, get_weather):
         """Creating a day requires all elves to be sent.
         """
-        random.choice.return_value = 'good'
+        get_weather.return_value = 'good'
 
         response = self.client.post(
             reverse('session-day', kwargs={'pk': self.SESSION_ID}),
@@ -338,13 +788,13 @@ class GameTestCase(test.APITestCase):
                              ['You must send exactly 11 elves'])
         self.assertListEqual(response.data['elves_mountains'],
                              ['You must send exactly 11 elves'])
-        self.assertFalse(random.choice.called)
+        self.assertFalse(get_weather.called)
 
-    @patch('elves.game.models.random')
-    def test_create_too_many_elves(self, random):
+    @patch('elves.game.models.Session.get_weather')
+    def test_create_too_many_elves(self, get_weather):
         """Can only send available elves.
         """
-        random.choice.return_value = 'good'
+        get_weather.return_value = 'good'
 
         response = self.client.post(
             reverse('session-day', kwargs={'pk': self.SESSION_ID}),
@@ -362,7 +812,46 @@ class GameTestCase(test.APITestCase):
                              ['You must send exactly 11 elves'])
         self.assertListEqual(response.data['elves_mountains'],
                              ['You must send exactly 11 elves'])
-        self.assertFalse(random.choice.called)
+        self.assertFalse(get_weather.called)
+
+    def test_create_day_query_count(self):
+        """Playing a turn loads, updates and inserts once each.
+
+        The savepoints come from the transaction around the insert.
+        """
+        with self.assertNumQueries(5):
+            response = self.client.post(
+                reverse('session-day', kwargs={'pk': self.SESSION_ID}),
+                {
+                    'elves_woods': 5,
+                    'elves_forest': 5,
+                    'elves_mountains': 1,
+                })
+
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+
+    def test_create_day_conflict(self):
+        """A turn racing with another turn for the session returns 409.
+        """
+        stale = self._get_session()
+        Day.objects.create(session=self._get_session(),
+                           elves_woods=11,
+                           elves_forest=0,
+                           elves_mountains=0,
+                           weather='good')
+
+        with patch('elves.game.views.SessionViewSet.get_object',
+                   return_value=stale):
+            response = self.client.post(
+                reverse('session-day', kwargs={'pk': self.SESSION_ID}),
+                {
+                    'elves_woods': 5,
+                    'elves_forest': 5,
+                    'elves_mountains': 1,
+                })
+
+        self.assertEqual(response.status_code, status.HTTP_409_CONFLICT)
+        self.assertEqual(self._get_session().days.count(), 3)
 
     def test_positive_elves(self):
         """Each elf field must be a positive number.
@@ -380,11 +869,11 @@ class GameTestCase(test.APITestCase):
         self.assertListEqual(response.data['elves_woods'],
                              ['This field must be >= 0'])
 
-    @patch('elves.game.models.random')
-    def test_max_turns(self, random):
+    @patch('elves.game.models.Session.get_weather')
+    def test_max_turns(self, get_weather):
         """Can only run the game for 10 rounds.
         """
-        random.choice.return_value = 'good'
+        get_weather.return_value = 'good'
         for x in range(3, 11):
             Day.objects.create(
                 elves_woods=11,
@@ -411,3 +900,1432 @@ class GameTestCase(test.APITestCase):
         """Get the active session.
         """
         return Session.objects.get(pk='fd5b2d8e-78f9-40b3-9d6a-3c39a17ba106')
+
+
+class LeaderboardTestCase(test.APITestCase):
+    """Test the leaderboard of completed games.
+    """
+
+    fixtures = [
+        'game/sessions',
+    ]
+
+    def test_completed_only(self):
+        """Only completed sessions appear on the leaderboard.
+        """
+        response = self.client.get(reverse('leaderboard-list'))
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(len(response.data), 1)
+        self.assertEqual(response.data[0]['player_name'], 'John Smith')
+        self.assertEqual(response.data[0]['money_made'], '990.00')
+
+    @patch('elves.game.models.Session.get_weather')
+    def test_final_day_enters_leaderboard(self, get_weather):
+        """Playing the final day adds the session in money order.
+        """
+        get_weather.return_value = 'good'
+        for x in range(3, 11):
+            Day.objects.create(
+                elves_woods=0,
+                elves_forest=0,
+                elves_mountains=11,
+                session=self._get_session())
+
+        response = self.client.get(reverse('leaderboard-list'))
+
+        self.assertListEqual([s['player_name'] for s in response.data],
+                             ['Steve Jones', 'John Smith'])
+        self.assertEqual(response.data[0]['money_made'], '4650.00')
+
+    def test_limit(self):
+        """The limit caps the number of sessions returned.
+        """
+        Session.objects.bulk_create(
+            Session(player_name='Player {}'.format(i), elves_remaining=12,
+                    day_count=10, money_total=i, final_money=i)
+            for i in range(20))
+
+        with self.assertNumQueries(1):
+            response = self.client.get(reverse('leaderboard-list'),
+                                       {'limit': 3})
+
+        self.assertListEqual([s['money_made'] for s in response.data],
+                             ['990.00', '19.00', '18.00'])
+
+    def _get_session(self):
+        """Get the active session.
+        """
+        return Session.objects.get(pk='fd5b2d8e-78f9-40b3-9d6a-3c39a17ba106')
+
+
+class RankTestCase(test.APITestCase):
+    """Test ranking completed games against each other.
+    """
+
+    fixtures = [
+        'game/sessions',
+    ]
+
+    COMPLETE_ID = 'b299778c-b7c2-4ffb-8403-d6dfe6923793'
+    SESSION_ID = 'fd5b2d8e-78f9-40b3-9d6a-3c39a17ba106'
+
+    def setUp(self):
+        """Start without any cached responses.
+        """
+        response_cache.cache.clear()
+
+    def test_rank_only_player(self):
+        """The only completed session is first and beat nobody.
+        """
+        response = self.client.get(
+            reverse('session-rank', kwargs={'pk': self.COMPLETE_ID}))
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertDictEqual(response.data,
+                             {'rank': 1, 'players': 1, 'percentile': 0.0})
+
+    def test_rank_active_session(self):
+        """A session still being played has no rank.
+        """
+        response = self.client.get(
+            reverse('session-rank', kwargs={'pk': self.SESSION_ID}))
+
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    @patch('elves.game.models.Session.get_weather')
+    def test_final_day_updates_histogram(self, get_weather):
+        """Completing a session adds it to the histogram.
+        """
+        get_weather.return_value = 'good'
+        for x in range(3, 11):
+            Day.objects.create(
+                elves_woods=0,
+                elves_forest=0,
+                elves_mountains=11,
+                session=Session.objects.get(pk=self.SESSION_ID))
+
+        response = self.client.get(
+            reverse('session-rank', kwargs={'pk': self.COMPLETE_ID}))
+
+        self.assertDictEqual(response.data,
+                             {'rank': 2, 'players': 2, 'percentile': 0.0})
+
+        response = self.client.get(
+            reverse('session-rank', kwargs={'pk': self.SESSION_ID}))
+
+        self.assertDictEqual(response.data,
+                             {'rank': 1, 'players': 2, 'percentile': 50.0})
+
+    def test_rank_ties(self):
+        """Sessions with the same score share a rank.
+        """
+        ScoreBucket.objects.add(Decimal('990.00'))
+        ScoreBucket.objects.add(Decimal('500.00'))
+
+        with self.assertNumQueries(1):
+            rank = ScoreBucket.objects.rank(Decimal('990.00'))
+
+        self.assertDictEqual(rank,
+                             {'rank': 1, 'players': 3, 'percentile': 33.33})
+
+    def test_delete_updates_histogram(self):
+        """Deleting a completed session takes it out of the histogram.
+        """
+        ScoreBucket.objects.add(Decimal('990.00'))
+
+        Session.objects.get(pk=self.COMPLETE_ID).delete()
+        Session.objects.filter(pk=self.SESSION_ID).delete()
+
+        self.assertDictEqual(ScoreBucket.objects.rank(Decimal('990.00')),
+                             {'rank': 1, 'players': 1, 'percentile': 0.0})
+
+    def test_rank_on_retrieve(self):
+        """Retrieving a completed session includes its rank.
+        """
+        response = self.client.get(
+            reverse('session-detail', kwargs={'pk': self.COMPLETE_ID}))
+
+        self.assertDictEqual(response.data['rank'],
+                             {'rank': 1, 'players': 1, 'percentile': 0.0})
+
+        response = self.client.get(
+            reverse('session-detail', kwargs={'pk': self.SESSION_ID}))
+
+        self.assertIsNone(response.data['rank'])
+
+
+class BatchTestCase(test.APITestCase):
+    """Test creating sessions and playing days in batches.
+    """
+
+    fixtures = [
+        'game/sessions',
+    ]
+
+    COMPLETE_ID = 'b299778c-b7c2-4ffb-8403-d6dfe6923793'
+    SESSION_ID = 'fd5b2d8e-78f9-40b3-9d6a-3c39a17ba106'
+
+    def setUp(self):
+        """Start without any cached responses.
+        """
+        response_cache.cache.clear()
+
+    def test_batch_sessions(self):
+        """Many sessions are created with a single insert.
+        """
+        with self.assertNumQueries(1):
+            response = self.client.post(
+                reverse('session-batch'),
+                [{'player_name': 'Bot {}'.format(i)} for i in range(50)],
+                format='json')
+
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(len(response.data), 50)
+        self.assertEqual(response.data[0]['player_name'], 'Bot 0')
+        self.assertEqual(response.data[0]['elves_remaining'], 12)
+        self.assertEqual(Session.objects.count(), 52)
+
+    def test_batch_too_large(self):
+        """A batch larger than the limit is rejected.
+        """
+        response = self.client.post(
+            reverse('session-batch'),
+            [{'player_name': 'Bot'}] * 501,
+            format='json')
+
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(Session.objects.count(), 2)
+
+    def test_batch_sessions_invalid(self):
+        """An invalid session fails the whole batch.
+        """
+        response = self.client.post(
+            reverse('session-batch'),
+            [{'player_name': 'Bot'}, {}],
+            format='json')
+
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(Session.objects.count(), 2)
+
+    @patch('elves.game.models.Session.get_weather')
+    def test_batch_days(self, get_weather):
+        """Each day in a batch is applied separately with its own result.
+        """
+        get_weather.return_value = 'good'
+        other = Session.objects.create(player_name='Jane Smith')
+
+        response = self.client.post(
+            reverse('session-batch-day'),
+            [
+                {'session': self.SESSION_ID, 'elves_woods': 11,
+                 'elves_forest': 0, 'elves_mountains': 0},
+                {'session': str(other.uuid), 'elves_woods': 1,
+                 'elves_forest': 0, 'elves_mountains': 0},
+                {'session': self.COMPLETE_ID, 'elves_woods': 8,
+                 'elves_forest': 0, 'elves_mountains': 0},
+                {'session': '00000000-0000-0000-0000-000000000000',
+                 'elves_woods': 12, 'elves_forest': 0, 'elves_mountains': 0},
+                {'session': self.SESSION_ID, 'elves_woods': 0,
+                 'elves_forest': 11, 'elves_mountains': 0},
+            ],
+            format='json')
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertListEqual([r['status'] for r in response.data],
+                             [201, 400, 400, 404, 201])
+        self.assertEqual(response.data[0]['day']['day'], 3)
+        self.assertEqual(response.data[4]['day']['day'], 4)
+        self.assertListEqual(response.data[1]['errors']['elves_woods'],
+                             ['You must send exactly 12 elves'])
+        self.assertListEqual(response.data[2]['errors']['day'],
+                             ['Your elf game has completed at 10 turns!'])
+
+        session = Session.objects.get(pk=self.SESSION_ID)
+        self.assertEqual(session.day_count, 4)
+        self.assertEqual(session.money_total, Decimal('580.00'))
+
+    def test_batch_days_invalid_session(self):
+        """A malformed session uuid fails the whole batch.
+        """
+        response = self.client.post(
+            reverse('session-batch-day'),
+            [{'session': 'not-a-uuid', 'elves_woods': 12,
+              'elves_forest': 0, 'elves_mountains': 0}],
+            format='json')
+
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+
+class BroadcasterTestCase(TestCase):
+    """Test batching session updates into websocket frames.
+    """
+
+    SESSION = {
+        'uuid': 'fd5b2d8e-78f9-40b3-9d6a-3c39a17ba106',
+        'player_name': 'Steve Jones',
+        'current_day': 2,
+        'elves_remaining': 11,
+        'money_made': '250.00',
+    }
+
+    def setUp(self):
+        """Record the frames sent to each group.
+        """
+        self.groups = defaultdict(Mock)
+        patcher = patch('elves.game.broadcast.Group',
+                        side_effect=lambda name: self.groups[name])
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    @override_settings(ELVES_BROADCAST_WINDOW=0)
+    def test_first_update_in_full(self):
+        """A session is sent in full the first time it's seen.
+        """
+        broadcaster = Broadcaster()
+        broadcaster.publish(self.SESSION)
+
+        self.assertDictEqual(self._get_frame('session'), {
+            'stream': broadcaster.stream,
+            'seq': 1,
+            'sessions': {
+                self.SESSION['uuid']: {
+                    'player_name': 'Steve Jones',
+                    'current_day': 2,
+                    'elves_remaining': 11,
+                    'money_made': '250.00',
+                },
+            },
+        })
+
+    @override_settings(ELVES_BROADCAST_WINDOW=0)
+    def test_delta(self):
+        """Later updates only send the changed fields.
+        """
+        broadcaster = Broadcaster()
+        broadcaster.publish(self.SESSION)
+        broadcaster.publish(dict(self.SESSION, current_day=3,
+                                 money_made='300.00'))
+
+        self.assertDictEqual(self._get_frame('session'), {
+            'stream': broadcaster.stream,
+            'seq': 2,
+            'sessions': {
+                self.SESSION['uuid']: {
+                    'current_day': 3,
+                    'money_made': '300.00',
+                },
+            },
+        })
+
+    @override_settings(ELVES_BROADCAST_WINDOW=0)
+    def test_unchanged(self):
+        """An update that changes nothing isn't sent.
+        """
+        broadcaster = Broadcaster()
+        broadcaster.publish(self.SESSION)
+        broadcaster.publish(self.SESSION)
+
+        self.assertEqual(self.groups['session'].send.call_count, 1)
+
+    @override_settings(ELVES_BROADCAST_WINDOW=60)
+    def test_coalesce(self):
+        """Updates within the window are sent as one frame.
+        """
+        broadcaster = Broadcaster()
+        broadcaster.publish(self.SESSION)
+        broadcaster.publish(dict(self.SESSION, current_day=3))
+        broadcaster.publish(dict(self.SESSION, uuid='other'))
+        broadcaster._timer.cancel()
+
+        self.assertFalse(self.groups)
+        broadcaster.flush()
+
+        frame = self._get_frame('session')
+        self.assertEqual(frame['seq'], 1)
+        self.assertListEqual(list(frame['sessions']),
+                             [self.SESSION['uuid'], 'other'])
+        self.assertEqual(frame['sessions'][self.SESSION['uuid']]
+                         ['current_day'], 3)
+
+    @override_settings(ELVES_BROADCAST_WINDOW=0)
+    def test_forgotten_session(self):
+        """Sessions beyond the limit are forgotten and sent in full.
+        """
+        broadcaster = Broadcaster(max_sessions=1)
+        broadcaster.publish(self.SESSION)
+        broadcaster.publish(dict(self.SESSION, uuid='other'))
+        broadcaster.publish(self.SESSION)
+
+        frame = self._get_frame('session')
+        self.assertEqual(len(frame['sessions'][self.SESSION['uuid']]), 4)
+
+    @override_settings(ELVES_BROADCAST_WINDOW=0)
+    def test_session_group(self):
+        """Each session's group only gets that session, with its own seq.
+        """
+        broadcaster = Broadcaster()
+        broadcaster.publish(self.SESSION)
+        broadcaster.publish(dict(self.SESSION, uuid='other'))
+        broadcaster.publish(dict(self.SESSION, current_day=3))
+
+        self.assertDictEqual(
+            self._get_frame('session-' + self.SESSION['uuid']),
+            {
+                'stream': broadcaster.stream,
+                'seq': 2,
+                'sessions': {self.SESSION['uuid']: {'current_day': 3}},
+            })
+        self.assertEqual(self._get_frame('session-other')['seq'], 1)
+        self.assertEqual(self._get_frame('session')['seq'], 3)
+
+    @override_settings(ELVES_BROADCAST_WINDOW=0)
+    def test_leaderboard_group(self):
+        """The leaderboard group only gets completed sessions, in full.
+        """
+        broadcaster = Broadcaster()
+        broadcaster.publish(self.SESSION)
+        self.assertNotIn('leaderboard', self.groups)
+
+        broadcaster.publish(dict(self.SESSION, current_day=10))
+
+        self.assertDictEqual(self._get_frame('leaderboard'), {
+            'stream': broadcaster.stream,
+            'seq': 1,
+            'sessions': {
+                self.SESSION['uuid']: {
+                    'player_name': 'Steve Jones',
+                    'current_day': 10,
+                    'elves_remaining': 11,
+                    'money_made': '250.00',
+                },
+            },
+        })
+
+    @override_settings(ELVES_BROADCAST_WINDOW=0)
+    def test_leaderboard_group_ranked(self):
+        """Sessions that aren't ranked never reach the leaderboard group.
+        """
+        broadcaster = Broadcaster()
+        broadcaster.publish(dict(self.SESSION, current_day=10), ranked=False)
+
+        self.assertEqual(self._get_frame('session')['sessions'][
+            self.SESSION['uuid']]['current_day'], 10)
+        self.assertNotIn('leaderboard', self.groups)
+
+    @override_settings(ELVES_BROADCAST_WINDOW=0)
+    def test_stream(self):
+        """Each process names its frames with its own stream.
+        """
+        broadcaster = Broadcaster()
+        broadcaster.publish(self.SESSION)
+        stream = self._get_frame('session')['stream']
+        self.assertEqual(stream, broadcaster.stream)
+
+        with patch('elves.game.broadcast.os.getpid', return_value=-1):
+            broadcaster.publish(dict(self.SESSION, current_day=3))
+        self.assertNotEqual(self._get_frame('session')['stream'], stream)
+
+    @override_settings(ELVES_BROADCAST_WINDOW=0)
+    def test_metrics(self):
+        """Frames are counted and sized by group, without the session uuid.
+        """
+        frames = sent_frames.get(group='session-<uuid>')
+        count, size = frame_bytes.get(group='session-<uuid>')
+
+        Broadcaster().publish(self.SESSION)
+
+        group = self.groups['session-' + self.SESSION['uuid']]
+        text = group.send.call_args[0][0]['text']
+        self.assertEqual(sent_frames.get(group='session-<uuid>'), frames + 1)
+        self.assertEqual(frame_bytes.get(group='session-<uuid>'),
+                         (count + 1, size + len(text)))
+
+    def _get_frame(self, name):
+        """Return the last frame sent to the named group.
+        """
+        return json.loads(self.groups[name].send.call_args[0][0]['text'])
+
+
+@override_settings(ELVES_BROADCAST_WINDOW=0)
+class NotificationTestCase(TransactionTestCase):
+    """Test sessions are only broadcast once they are committed.
+    """
+
+    fixtures = [
+        'game/sessions',
+    ]
+
+    SESSION_ID = 'fd5b2d8e-78f9-40b3-9d6a-3c39a17ba106'
+
+    def setUp(self):
+        """Use a fresh broadcaster and record what it sends.
+        """
+        self.broadcaster = Broadcaster()
+        self.client = test.APIClient()
+
+        patcher = patch('elves.game.views.broadcaster', self.broadcaster)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+        patcher = patch('elves.game.broadcast.Group')
+        self.group = patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_broadcast_after_commit(self):
+        """A new day is broadcast in the background after it's saved.
+        """
+        self.client.post(
+            reverse('session-day', kwargs={'pk': self.SESSION_ID}),
+            {
+                'elves_woods': 11,
+                'elves_forest': 0,
+                'elves_mountains': 0,
+            })
+        self.broadcaster.join()
+
+        message = self.group.return_value.send.call_args[0][0]
+        frame = json.loads(message['text'])
+        self.assertEqual(frame['sessions'][self.SESSION_ID]['current_day'], 3)
+        self.assertEqual(self.broadcaster.queue_depth, 0)
+
+    def test_no_broadcast_on_rollback(self):
+        """Nothing is broadcast if the transaction is rolled back.
+        """
+        with self.assertRaises(RuntimeError):
+            with transaction.atomic():
+                self.client.post(
+                    reverse('session-day', kwargs={'pk': self.SESSION_ID}),
+                    {
+                        'elves_woods': 11,
+                        'elves_forest': 0,
+                        'elves_mountains': 0,
+                    })
+                raise RuntimeError
+
+        self.broadcaster.join()
+        self.assertFalse(self.group.called)
+
+    @override_settings(ELVES_BROADCAST_WINDOW=0)
+    @patch('elves.game.models.Session.get_weather')
+    def test_seeded_not_on_leaderboard(self, get_weather):
+        """A seeded session completing isn't sent to the leaderboard.
+        """
+        get_weather.return_value = 'good'
+        Session.objects.filter(pk=self.SESSION_ID).update(seeded=True)
+        for _ in range(3, 11):
+            self.client.post(
+                reverse('session-day', kwargs={'pk': self.SESSION_ID}),
+                {
+                    'elves_woods': 11,
+                    'elves_forest': 0,
+                    'elves_mountains': 0,
+                })
+        self.broadcaster.join()
+
+        groups = [call[0][0] for call in self.group.call_args_list]
+        self.assertIn('session', groups)
+        self.assertNotIn('leaderboard', groups)
+
+    def test_queue_depth(self):
+        """Submitted sessions are counted until they are published.
+        """
+        self.broadcaster._worker = Mock()
+        self.broadcaster.submit(Session.objects.get(pk=self.SESSION_ID))
+        self.broadcaster.submit(Session.objects.get(pk=self.SESSION_ID))
+
+        self.assertEqual(self.broadcaster.queue_depth, 2)
+
+
+class ConsumerTestCase(ChannelTestCase):
+    """Test subscribing to websocket groups.
+    """
+
+    SESSION_ID = 'fd5b2d8e-78f9-40b3-9d6a-3c39a17ba106'
+
+    def test_all_sessions(self):
+        """Connecting to any other path follows every session.
+        """
+        client = WSClient()
+        client.send_and_consume('websocket.connect', path='/session/')
+
+        Group('session').send({'text': '{"seq": 1}'})
+        self.assertDictEqual(client.receive(), {'seq': 1})
+
+    def test_single_session(self):
+        """Connecting to a session's path only follows that session.
+        """
+        client = WSClient()
+        client.send_and_consume(
+            'websocket.connect',
+            path='/ws/game/{}/'.format(self.SESSION_ID))
+
+        Group('session').send({'text': '{"seq": 1}'})
+        self.assertIsNone(client.receive())
+
+        Group('session-' + self.SESSION_ID).send({'text': '{"seq": 2}'})
+        self.assertDictEqual(client.receive(), {'seq': 2})
+
+    def test_single_session_upper_case(self):
+        """A session's path can give its UUID in upper case.
+        """
+        client = WSClient()
+        client.send_and_consume(
+            'websocket.connect',
+            path='/ws/game/{}/'.format(self.SESSION_ID.upper()))
+
+        Group('session').send({'text': '{"seq": 1}'})
+        self.assertIsNone(client.receive())
+
+        Group('session-' + self.SESSION_ID).send({'text': '{"seq": 2}'})
+        self.assertDictEqual(client.receive(), {'seq': 2})
+
+    def test_leaderboard(self):
+        """Connecting to the leaderboard path only follows completed sessions.
+        """
+        client = WSClient()
+        client.send_and_consume('websocket.connect', path='/ws/leaderboard/')
+
+        Group('session').send({'text': '{"seq": 1}'})
+        self.assertIsNone(client.receive())
+
+        Group('leaderboard').send({'text': '{"seq": 2}'})
+        self.assertDictEqual(client.receive(), {'seq': 2})
+
+
+class StorageTestCase(TransactionTestCase):
+    """Test the SQLite storage tuning.
+    """
+
+    fixtures = [
+        'game/sessions',
+    ]
+
+    SESSION_ID = 'fd5b2d8e-78f9-40b3-9d6a-3c39a17ba106'
+
+    @override_settings(ELVES_SQLITE_PRAGMAS={'cache_size': -1234})
+    def test_pragmas(self):
+        """The configured pragmas are run on new connections.
+        """
+        set_pragmas(sender=None, connection=connection)
+
+        with connection.cursor() as cursor:
+            cursor.execute('PRAGMA cache_size')
+            self.assertEqual(cursor.fetchone()[0], -1234)
+
+    @override_settings(ELVES_GROUP_COMMIT=0.05)
+    def test_group_commit(self):
+        """Concurrent writes are made in one transaction by one thread.
+        """
+        commit = GroupCommit()
+        writers = []
+        results = []
+
+        def write(value):
+            writers.append(threading.get_ident())
+            return value
+
+        def play(value):
+            results.append(commit.run(lambda: write(value)))
+            connection.close()
+
+        threads = [threading.Thread(target=play, args=(i,)) for i in range(3)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(sorted(results), [0, 1, 2])
+        self.assertEqual(len(set(writers)), 1)
+
+    @override_settings(ELVES_GROUP_COMMIT=0.001)
+    def test_group_commit_error(self):
+        """A failed write raises to its caller and is rolled back alone.
+        """
+        commit = GroupCommit()
+
+        def fail():
+            Session.objects.filter(pk=self.SESSION_ID).update(day_count=5)
+            raise TurnConflict(Session.objects.get(pk=self.SESSION_ID))
+
+        with self.assertRaises(TurnConflict):
+            commit.run(fail)
+        self.assertEqual(Session.objects.get(pk=self.SESSION_ID).day_count, 2)
+
+    @override_settings(ELVES_GROUP_COMMIT=0.001)
+    def test_create_day(self):
+        """Days are created as normal with group commit on.
+        """
+        client = test.APIClient()
+        response = client.post(
+            reverse('session-day', kwargs={'pk': self.SESSION_ID}),
+            {
+                'elves_woods': 11,
+                'elves_forest': 0,
+                'elves_mountains': 0,
+            })
+
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(response.data['day'], 3)
+        self.assertEqual(Session.objects.get(pk=self.SESSION_ID).day_count, 3)
+
+
+class CacheTestCase(test.APITestCase):
+    """Test caching the session list and details between writes.
+    """
+
+    fixtures = [
+        'game/sessions',
+    ]
+
+    SESSION_ID = 'fd5b2d8e-78f9-40b3-9d6a-3c39a17ba106'
+
+    def setUp(self):
+        """Start without any cached responses.
+        """
+        response_cache.cache.clear()
+
+    def test_list_cached(self):
+        """Listing again is served from the cache without any queries.
+        """
+        response = self.client.get(reverse('session-list'), {'active': 'only'})
+        self.assertEqual(response['X-Cache'], 'MISS')
+
+        with self.assertNumQueries(0):
+            response = self.client.get(reverse('session-list'),
+                                       {'active': 'only'})
+        self.assertEqual(response['X-Cache'], 'HIT')
+        self.assertEqual(len(response.data), 1)
+
+    def test_day_invalidates(self):
+        """Playing a turn makes the cached responses stale.
+        """
+        url = reverse('session-detail', kwargs={'pk': self.SESSION_ID})
+        self.client.get(url)
+        self.client.post(
+            reverse('session-day', kwargs={'pk': self.SESSION_ID}),
+            {
+                'elves_woods': 11,
+                'elves_forest': 0,
+                'elves_mountains': 0,
+            })
+
+        response = self.client.get(url)
+        self.assertEqual(response['X-Cache'], 'MISS')
+        self.assertEqual(response.data['current_day'], 3)
+
+    def test_read_before_commit(self):
+        """A response read before a write commits isn't cached under the
+        version the commit makes.
+        """
+        path = 'http://testserver/game/'
+        key, _ = response_cache.get(path)
+
+        # The write commits between the read and caching its response.
+        response_cache._new_version()
+        response_cache.set(key, 'stale')
+
+        self.assertIsNone(response_cache.get(path)[1])
+
+    def test_batch_invalidates(self):
+        """Creating a batch of sessions makes the cached list stale.
+        """
+        self.client.get(reverse('session-list'))
+        self.client.post(reverse('session-batch'),
+                         [{'player_name': 'Jane Smith'}], format='json')
+
+        response = self.client.get(reverse('session-list'))
+        self.assertEqual(response['X-Cache'], 'MISS')
+        self.assertEqual(len(response.data), 3)
+
+    def test_cached_not_modified(self):
+        """A cached session still answers conditional requests.
+        """
+        url = reverse('session-detail', kwargs={'pk': self.SESSION_ID})
+        self.client.get(url)
+
+        response = self.client.get(url, HTTP_IF_NONE_MATCH='"2.2"')
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+        self.assertEqual(response['X-Cache'], 'HIT')
+
+    def test_stats(self):
+        """Hits and misses are counted.
+        """
+        stats = response_cache.stats()
+        self.client.get(reverse('session-list'))
+        self.client.get(reverse('session-list'))
+
+        self.assertDictEqual(response_cache.stats(), {
+            'hits': stats['hits'] + 1,
+            'misses': stats['misses'] + 1,
+        })
+
+
+class RenderingTestCase(test.APITestCase):
+    """Test the lean serializers and fast renderers match the defaults.
+    """
+
+    fixtures = [
+        'game/sessions',
+    ]
+
+    SESSION_ID = 'fd5b2d8e-78f9-40b3-9d6a-3c39a17ba106'
+
+    def setUp(self):
+        """Start without any cached responses.
+        """
+        response_cache.cache.clear()
+
+    def test_session_read(self):
+        """Sessions render the same as with SessionSerializer.
+        """
+        sessions = Session.objects.with_totals()
+
+        self.assertEqual(
+            self._render(SessionReadSerializer(sessions, many=True).data),
+            self._render(SessionSerializer(sessions, many=True).data))
+
+    def test_session_rank_read(self):
+        """Sessions with ranks render the same as with SessionRankSerializer.
+        """
+        for session in Session.objects.all():
+            self.assertEqual(
+                self._render(SessionRankReadSerializer(session).data),
+                self._render(SessionRankSerializer(session).data))
+
+    def test_day_read(self):
+        """Days render the same as with DaySerializer.
+        """
+        days = Day.objects.all()
+
+        self.assertEqual(
+            self._render(DayReadSerializer(days, many=True).data),
+            self._render(DaySerializer(days, many=True).data))
+
+    def test_fast_json(self):
+        """The fast renderer gives the same bytes as JSONRenderer.
+        """
+        data = {
+            'player_name': 'Ünïcode \u2028 "quoted"\n',
+            'money_made': Decimal('12.50'),
+            'days': [1, 2.5, None, True],
+        }
+
+        self.assertEqual(FastJSONRenderer().render(data),
+                         JSONRenderer().render(data))
+        self.assertEqual(
+            FastJSONRenderer().render(data, 'application/json; indent=4'),
+            JSONRenderer().render(data, 'application/json; indent=4'))
+
+    def test_msgpack_response(self):
+        """Bots can ask for MessagePack instead of JSON.
+        """
+        if msgpack is None:
+            self.skipTest('msgpack is not installed')
+
+        response = self.client.get(reverse('session-list'),
+                                   HTTP_ACCEPT='application/msgpack')
+
+        self.assertEqual(response['Content-Type'], 'application/msgpack')
+        sessions = msgpack.unpackb(response.content, raw=False)
+        self.assertEqual(sessions[0]['player_name'], 'Steve Jones')
+        self.assertEqual(sessions[0]['money_made'], '250.00')
+
+    def test_msgpack_request(self):
+        """Bots can send turns as MessagePack.
+        """
+        if msgpack is None:
+            self.skipTest('msgpack is not installed')
+
+        response = self.client.post(
+            reverse('session-day', kwargs={'pk': self.SESSION_ID}),
+            msgpack.packb({
+                'elves_woods': 11,
+                'elves_forest': 0,
+                'elves_mountains': 0,
+            }, use_bin_type=True),
+            content_type='application/msgpack')
+
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+
+    def _render(self, data):
+        return JSONRenderer().render(data)
+
+
+class ReplayTestCase(TestCase):
+    """Test recording sessions to replay.
+    """
+
+    fixtures = [
+        'game/sessions',
+    ]
+
+    def test_record(self):
+        """Each session is recorded with its seed and turns, oldest first.
+        """
+        handle, path = tempfile.mkstemp(suffix='.json')
+        os.close(handle)
+        self.addCleanup(os.remove, path)
+
+        call_command('elves_replay', 'record', path, stdout=Mock())
+
+        with open(path) as f:
+            sessions = json.load(f)['sessions']
+        self.assertListEqual([s['player_name'] for s in sessions],
+                             ['Steve Jones', 'John Smith'])
+        self.assertEqual(sessions[0]['seed'], 1)
+        self.assertDictEqual(sessions[0]['days'][1], {
+            'elves_woods': 6,
+            'elves_forest': 5,
+            'elves_mountains': 1,
+            'weather': 'snow',
+        })
+
+    def test_record_day_order(self):
+        """Turns are recorded in the order they were played.
+        """
+        handle, path = tempfile.mkstemp(suffix='.json')
+        os.close(handle)
+        self.addCleanup(os.remove, path)
+        Day.objects.filter(pk=1).update(day=99)
+        Day.objects.filter(pk=2).update(day=1)
+        Day.objects.filter(pk=1).update(day=2)
+
+        call_command('elves_replay', 'record', path, stdout=Mock())
+
+        with open(path) as f:
+            days = json.load(f)['sessions'][0]['days']
+        self.assertListEqual([day['weather'] for day in days],
+                             ['snow', 'good'])
+
+
+class MetricsTestCase(test.APITestCase):
+    """Test collecting metrics and rendering them for Prometheus.
+    """
+
+    fixtures = [
+        'game/sessions',
+    ]
+
+    SESSION_ID = 'fd5b2d8e-78f9-40b3-9d6a-3c39a17ba106'
+
+    def setUp(self):
+        """Start without any cached responses.
+        """
+        response_cache.cache.clear()
+
+    def test_render(self):
+        """Metrics are rendered in the Prometheus text format.
+        """
+        registry = Registry()
+        turns = registry.register(Counter(
+            'turns_total', 'Turns played.', labels=('weather',)))
+        latency = registry.register(Histogram(
+            'latency_seconds', 'Latency.', buckets=(0.1, 1)))
+        turns.inc(weather='snow')
+        turns.inc(2, weather='snow')
+        latency.observe(0.5)
+
+        self.assertEqual(registry.render(), '\n'.join([
+            '# HELP turns_total Turns played.',
+            '# TYPE turns_total counter',
+            'turns_total{weather="snow"} 3',
+            '# HELP latency_seconds Latency.',
+            '# TYPE latency_seconds histogram',
+            'latency_seconds_bucket{le="0.1"} 0',
+            'latency_seconds_bucket{le="1"} 1',
+            'latency_seconds_bucket{le="+Inf"} 1',
+            'latency_seconds_sum 0.5',
+            'latency_seconds_count 1',
+        ]) + '\n')
+
+    def test_labels_required(self):
+        """Every label must be given a value.
+        """
+        turns = Counter('turns_total', 'Turns played.', labels=('weather',))
+        with self.assertRaises(ValueError):
+            turns.inc()
+
+    def test_request_action(self):
+        """Requests are timed against their view and action.
+        """
+        labels = {'view': 'SessionViewSet', 'action': 'day_list',
+                  'method': 'POST'}
+        count, _ = request_seconds.get(**labels)
+
+        self.client.post(
+            reverse('session-day', kwargs={'pk': self.SESSION_ID}),
+            {'elves_woods': 11, 'elves_forest': 0, 'elves_mountains': 0})
+
+        self.assertEqual(request_seconds.get(**labels)[0], count + 1)
+
+    def test_query_log(self):
+        """Queries are counted without being kept in the query log.
+        """
+        labels = {'view': 'SessionViewSet', 'action': 'list',
+                  'method': 'GET'}
+        _, total = request_queries.get(**labels)
+
+        with patch.object(CursorDebugWrapper, 'execute') as execute:
+            self.client.get(reverse('session-list'))
+
+        execute.assert_not_called()
+        self.assertGreater(request_queries.get(**labels)[1], total)
+        self.assertFalse(connection.force_debug_cursor)
+        self.assertNotIn('make_debug_cursor',
+                         vars(connections[DEFAULT_DB_ALIAS]))
+        self.assertEqual(len(connection.queries_log), 0)
+
+    @override_settings(DEBUG=True)
+    def test_debug_query_log(self):
+        """Queries are still logged with DEBUG on.
+        """
+        self.client.get(reverse('session-list'))
+
+        self.assertGreater(len(connection.queries_log), 0)
+
+    def test_endpoint(self):
+        """The metrics are served as text for Prometheus.
+        """
+        self.client.get(reverse('session-detail',
+                                kwargs={'pk': self.SESSION_ID}))
+
+        response = self.client.get(reverse('metrics'))
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertTrue(response['Content-Type'].startswith('text/plain'))
+        content = response.content.decode('utf-8')
+        self.assertIn('elves_request_queries_bucket{view="SessionViewSet",'
+                      'action="retrieve",method="GET",le="1"}', content)
+        self.assertIn('elves_response_cache_lookups_total{result="miss"}',
+                      content)
+        self.assertIn('elves_broadcast_queue_depth ', content)
+
+    def test_endpoint_restricted(self):
+        """Only staff and scrapers from an allowed address get the metrics.
+        """
+        url = reverse('metrics')
+
+        response = self.client.get(url, REMOTE_ADDR='203.0.113.1')
+        self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
+
+        response = self.client.get(url, HTTP_X_FORWARDED_FOR='203.0.113.1')
+        self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
+
+        with override_settings(ELVES_METRICS_IPS=['203.0.113.1']):
+            response = self.client.get(url, REMOTE_ADDR='203.0.113.1')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+        self.client.force_login(User.objects.create_user(
+            'staff', is_staff=True))
+        response = self.client.get(url, REMOTE_ADDR='203.0.113.1',
+                                   HTTP_X_FORWARDED_FOR='203.0.113.1')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+
+class ProfilingTestCase(test.APITestCase):
+    """Test profiling requests on demand.
+    """
+
+    fixtures = [
+        'game/sessions',
+    ]
+
+    SESSION_ID = 'fd5b2d8e-78f9-40b3-9d6a-3c39a17ba106'
+
+    def setUp(self):
+        """Sign in as staff, without any cached responses.
+        """
+        response_cache.cache.clear()
+        self.client.force_authenticate(User.objects.create_user(
+            'staff', is_staff=True))
+
+    def test_staff_only(self):
+        """Requests from other users aren't profiled.
+        """
+        self.client.force_authenticate(User.objects.create_user('player'))
+
+        response = self.client.get(self._get_url(), {'profile': ''})
+
+        self.assertFalse(response.has_header('X-Profile'))
+
+    def test_summary(self):
+        """The breakdown is returned in a header with the usual response.
+        """
+        response = self.client.get(self._get_url(), HTTP_X_PROFILE='1')
+
+        self.assertEqual(response.data['player_name'], 'Steve Jones')
+        breakdown = json.loads(response['X-Profile'])
+        self.assertSetEqual(set(breakdown), {
+            'total', 'queries', 'sql', 'serializer', 'render', 'other'})
+        self.assertGreater(breakdown['queries'], 0)
+        self.assertGreater(breakdown['serializer'], 0)
+        self.assertGreater(breakdown['render'], 0)
+
+    def test_connection_restored(self):
+        """Queries aren't logged or timed once the profile stops.
+        """
+        self.client.post(
+            reverse('session-day', kwargs={'pk': self.SESSION_ID}),
+            {'elves_woods': 11, 'elves_forest': 0, 'elves_mountains': 0},
+            HTTP_X_PROFILE='summary')
+
+        self.assertFalse(connection.force_debug_cursor)
+        self.assertNotIn('make_debug_cursor',
+                         vars(connections[DEFAULT_DB_ALIAS]))
+        self.assertEqual(len(connection.queries_log), 0)
+
+    def test_stats(self):
+        """The stats mode returns the slowest functions instead.
+        """
+        response = self.client.get(self._get_url(), {'profile': 'stats'})
+
+        profile = json.loads(response.content.decode('utf-8'))
+        self.assertIn('sql', profile['breakdown'])
+        self.assertTrue(profile['functions'])
+        self.assertSetEqual(set(profile['functions'][0]),
+                            {'function', 'calls', 'total', 'cumulative'})
+
+    def test_trace(self):
+        """The trace mode writes a Chrome trace and the cProfile stats.
+        """
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory)
+
+        with override_settings(ELVES_PROFILE_DIR=directory):
+            response = self.client.get(self._get_url(), {'profile': 'trace'})
+
+        trace_path, stats_path = response['X-Profile-Trace'].split()
+        self.assertTrue(os.path.exists(stats_path))
+        with open(trace_path) as f:
+            events = json.load(f)['traceEvents']
+        self.assertEqual(events[0]['name'], 'SessionViewSet.retrieve')
+        self.assertIn('SELECT', [e['name'] for e in events
+                                 if e['cat'] == 'sql'])
+
+    def _get_url(self):
+        return reverse('session-detail', kwargs={'pk': self.SESSION_ID})
+
+
+class BenchmarkTestCase(TestCase):
+    """Test the micro-benchmarks still run.
+    """
+
+    def test_generate_sessions(self):
+        """Sessions are added up to the number asked for.
+        """
+        generate_sessions(15)
+        generate_sessions(40)
+
+        self.assertEqual(Session.objects.count(), 40)
+        self.assertEqual(
+            Session.objects.filter(final_money__isnull=False).count(),
+            Session.objects.filter(day_count=Session.MAX_DAYS).count())
+        with self.assertRaises(ValueError):
+            generate_sessions(10)
+
+    @override_settings(ALLOWED_HOSTS=['localhost'])
+    def test_benchmarks(self):
+        """Every benchmark runs against a small database.
+        """
+        for benchmark in BENCHMARKS:
+            params = (40,) if hasattr(benchmark, 'params') else ()
+            instance = benchmark()
+            instance.setup(*params)
+            for name in dir(instance):
+                if name.startswith('time_'):
+                    getattr(instance, name)(*params)
+
+
+class SimulatorTestCase(TestCase):
+    """Test the client's simulator plays by the server's rules.
+    """
+
+    def test_rules(self):
+        """Every split pays out and loses elves as a day would.
+        """
+        splits = [(woods, forest, 12 - woods - forest)
+                  for woods in range(13) for forest in range(13 - woods)]
+        woods, forest, mountains = simulator.numpy.array(splits).T
+
+        for weather in ('good', 'snow'):
+            good = simulator.numpy.full(len(splits), weather == 'good')
+            money, elves = simulator.apply_weather(woods, forest, mountains,
+                                                   good)
+            for split, made, returned in zip(splits, money.tolist(),
+                                             elves.tolist()):
+                day = Day(weather=weather, elves_woods=split[0],
+                          elves_forest=split[1], elves_mountains=split[2])
+                self.assertEqual(made, day.money_made, (weather, split))
+                self.assertEqual(returned, day.elves_returned,
+                                 (weather, split))
+
+    def test_turn_batch(self):
+        """A batched bot raises the same as calling turn for every game.
+        """
+        class OneAtATime(solver.OptimalGame):
+            turn_batch = None
+
+        batched = simulator.simulate(solver.OptimalGame, 500, seed=1,
+                                     batch_size=200)
+        unbatched = simulator.simulate(OneAtATime, 500, seed=1,
+                                       batch_size=200)
+        self.assertEqual(batched.amounts.tolist(),
+                         unbatched.amounts.tolist())
+
+    def test_turn_batch_wrong_elves(self):
+        """A batched bot must send every elf it has.
+        """
+        class Game:
+            @classmethod
+            def turn_batch(cls, elves, turn):
+                return elves, elves * 0, elves * 0 + (turn == 3)
+
+        with self.assertRaises(WrongElvesException):
+            simulator.simulate(Game, 10, seed=1)
+
+
+class SolverTestCase(TestCase):
+    """Test the client's optimal-policy solver.
+    """
+
+    def test_expected_value(self):
+        """The best strategy raises £1964.44 on average.
+        """
+        values, _ = solver.solve()
+        self.assertEqual(round(values[10][12], 2), Fraction('1964.44'))
+        self.assertEqual(values[10][12], Fraction(17680, 9))
+
+    def test_shipped_policy(self):
+        """policy.json is the table the solver gives.
+        """
+        self.assertEqual(solver.load_policy(), solver.solve()[1])
+
+
+class TournamentTestCase(TestCase):
+    """Test ranking bots by simulating their games.
+    """
+
+    BOTS = {
+        'tournament_optimal': (
+            'from pyne_xmas_elves.client.solver import OptimalGame as Game\n'),
+        'tournament_woods': (
+            'from pyne_xmas_elves.client import BaseGame\n'
+            'class Game(BaseGame):\n'
+            '    def turn(self, elves):\n'
+            '        return elves, 0, 0\n'),
+    }
+
+    def setUp(self):
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory)
+        for module, source in self.BOTS.items():
+            with open(os.path.join(directory, module + '.py'), 'w') as f:
+                f.write(source)
+
+        cwd = os.getcwd()
+        os.chdir(directory)
+        self.addCleanup(os.chdir, cwd)
+
+    def test_ranking(self):
+        """The bots are ranked by the mean raised, highest first.
+        """
+        results = tournament.run_tournament(
+            ['tournament_woods', 'tournament_optimal'], games=2500, seed=1,
+            processes=2, chunk_size=1000)
+
+        self.assertEqual([module for module, _ in results],
+                         ['tournament_optimal', 'tournament_woods'])
+        optimal, woods = (result for _, result in results)
+        self.assertEqual(len(optimal), 2500)
+        self.assertEqual(woods.confidence_interval(), (1200, 1200))
+
+        low, high = optimal.confidence_interval()
+        self.assertLess(low, 1964.44)
+        self.assertGreater(high, 1964.44)
+
+        lines = tournament.format_results(results).splitlines()
+        self.assertTrue(lines[1].startswith('1    tournament_optimal'))
+        self.assertTrue(lines[2].startswith('2    tournament_woods'))
+        self.assertIn('1200.00 - 1200.00', lines[2])
+
+    def test_no_games(self):
+        """A tournament needs at least one game.
+        """
+        with self.assertRaises(ValueError):
+            tournament.run_tournament(['tournament_woods'], games=0)
+
+    def test_confidence_interval(self):
+        """The interval is z standard errors either side of the mean.
+        """
+        result = simulator.SimulationResult(
+            simulator.numpy.array([0, 10, 0, 10]))
+        for z, expected in ((1.96, (0.1, 9.9)), (1, (2.5, 7.5))):
+            low, high = result.confidence_interval(z)
+            self.assertAlmostEqual(low, expected[0])
+            self.assertAlmostEqual(high, expected[1])
+
+
+class WorkerTestCase(TestCase):
+    """Test stopping a threaded worker.
+    """
+
+    def test_stop_waits_for_threads(self):
+        """An idle worker exits once its threads have handled their messages.
+        """
+        worker = GracefulWorkerGroup(channel_layer=Mock(), n_threads=2)
+        handled = threading.Event()
+
+        def handle():
+            time.sleep(0.1)
+            handled.set()
+
+        worker.workers[0].in_job = True
+        worker.threads = [threading.Thread(target=handle)]
+        worker.threads[0].start()
+
+        with self.assertRaises(SystemExit):
+            worker.sigterm_handler(None, None)
+        self.assertTrue(handled.is_set())
+        self.assertTrue(worker.termed)
+        self.assertTrue(worker.workers[0].termed)
+
+    def test_stop_busy(self):
+        """A busy worker handles its message before exiting.
+        """
+        worker = GracefulWorkerGroup(channel_layer=Mock(), n_threads=2)
+        worker.in_job = True
+
+        worker.sigterm_handler(None, None)
+        self.assertTrue(worker.termed)
+        self.assertTrue(worker.workers[0].termed)
+
+
+class TestHTTP:
+    """Stand in for an aiohttp session, posting to the Django test client.
+
+    Each request yields to the event loop, so games interleave as they would
+    over the network.
+    """
+
+    def __init__(self, client):
+        self.client = client
+        self.playing = set()
+        self.most_playing = 0
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc_info):
+        pass
+
+    def post(self, url, json):
+        return TestHTTPResponse(self, url, json)
+
+
+class TestHTTPResponse:
+    """The response to a TestHTTP request.
+    """
+
+    def __init__(self, http, url, data):
+        self.http = http
+        self.url = url
+        self.data = data
+        self.status = None
+        self._content = None
+
+    async def __aenter__(self):
+        await asyncio.sleep(0)
+        response = self.http.client.post(self.url, self.data, format='json')
+        self.status = response.status_code
+        self._content = response.content
+
+        session = self.url.split('/')[-3]
+        if self.url.endswith('/day/'):
+            self.http.playing.add(session)
+            self.http.most_playing = max(self.http.most_playing,
+                                         len(self.http.playing))
+            if response.status_code == 201 and response.data['day'] == 10:
+                self.http.playing.discard(session)
+        return self
+
+    async def __aexit__(self, *exc_info):
+        pass
+
+    async def text(self):
+        return self._content.decode('utf-8')
+
+
+class AsyncGameTestCase(test.APITestCase):
+    """Test playing many games at once with the async client.
+    """
+
+    class Game(aio.AsyncBaseGame):
+        PLAYER_NAME = 'Async Elf'
+        SERVER_URL = 'http://testserver/'
+
+        def turn(self, elves):
+            return elves, 0, 0
+
+    def setUp(self):
+        self.http = TestHTTP(self.client)
+        patcher = patch.object(aio, 'aiohttp', Mock(
+            ClientSession=Mock(return_value=self.http)))
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_play_games(self):
+        """Every game is played to the end, no more than `concurrency` at
+        once.
+        """
+        games = aio.run_games(self.Game, 5, concurrency=2)
+
+        self.assertEqual(len(games), 5)
+        for game in games:
+            self.assertEqual(game.amount_raised, Decimal('1200.00'))
+            session = Session.objects.get(pk=game._session_id)
+            self.assertEqual(session.final_money, Decimal('1200.00'))
+        self.assertEqual(self.http.most_playing, 2)
+
+    def test_sync_game(self):
+        """A BaseGame subclass is played the same way.
+        """
+        class Game(BaseGame):
+            PLAYER_NAME = 'Elf'
+            SERVER_URL = 'http://testserver/'
+
+            def turn(self, elves):
+                return 0, elves, 0
+
+        games = aio.run_games(Game, 2)
+        self.assertEqual(len(games), 2)
+        self.assertEqual(Session.objects.filter(player_name='Elf',
+                                                day_count=10).count(), 2)
+
+    def test_rejected_turn(self):
+        """A turn the server rejects raises ServerResponseException.
+        """
+        class Game(self.Game):
+            def turn(self, elves):
+                return elves + 1, -1, 0
+
+        with self.assertRaises(ServerResponseException) as raised:
+            aio.run_games(Game, 1)
+        self.assertIn('elves_forest: ', str(raised.exception))
+
+    def test_no_concurrency(self):
+        """At least one game must be played at a time.
+        """
+        with self.assertRaises(ValueError):
+            aio.run_games(self.Game, 1, concurrency=0)
+
+    def test_concurrency_argument(self):
+        """The command line rejects a concurrency below 1.
+        """
+        spec = util.spec_from_file_location('elves_cli', os.path.join(
+            settings.BASE_DIR, '..', '..', 'bin', 'elves.py'))
+        cli = util.module_from_spec(spec)
+        spec.loader.exec_module(cli)
+
+        with patch('sys.stderr'), self.assertRaises(SystemExit):
+            cli.play(['game', '--games', '5', '--concurrency', '0'])
@@ -1,26 +1,78 @@
 """Views for Managing a Session.
 """
-from json import dumps
-
+from django.conf import settings
+from django.core.exceptions import PermissionDenied
+from django.db import transaction
+from django.http import HttpResponse
 from django.http.request import HttpRequest
-from channels import Group
-from rest_framework import decorators, response, status, viewsets
+from django.utils.cache import get_conditional_response
+from rest_framework import (decorators, mixins, response, serializers, status,
+                            viewsets)
 
+from .broadcast import broadcaster
+from .cache import response_cache
+from .exceptions import TurnConflict
 from .filters import SessionFilterSet
+from .metrics import CONTENT_TYPE, registry
 from .models import Day, Session
-from .paginators import ResultsPaginator
-from .serializers import DaySerializer, SessionSerializer
+from .paginators import (CursorResultsPaginator, LeaderboardPaginator,
+                         ResultsPaginator)
+from .profiling import ProfiledViewMixin
+from .serializers import (DayBatchSerializer, DayReadSerializer,
+                          DaySerializer, RankSerializer,
+                          SessionRankReadSerializer, SessionRankSerializer,
+                          SessionReadSerializer, SessionSerializer)
+from .storage import group_commit
+
+FORWARDED_HEADERS = ('HTTP_FORWARDED', 'HTTP_X_FORWARDED_FOR',
+                     'HTTP_X_REAL_IP')
 
 
-class SessionViewSet(viewsets.ModelViewSet):
+class SessionViewSet(ProfiledViewMixin, viewsets.ModelViewSet):
     """Manage a Session and its Days.
+
+    Staff can profile a request by passing `profile`, see
+    elves.game.profiling.
     """
 
     filter_class = SessionFilterSet
-    queryset = Session.objects.all()
+    queryset = Session.objects.with_totals()
     pagination_class = ResultsPaginator
     serializer_class = SessionSerializer
 
+    MAX_BATCH_SIZE = 500
+
+    CACHED_HEADERS = ('ETag',)
+
+    ordering_fields = ('uuid', 'player_name', 'created', 'day_count',
+                       'elves_remaining', 'money_total', 'final_money')
+
+    # The lean read serializers have no fields, so are only used to render
+    # data, not for the browsable API's forms and filters.
+    READ_FORMATS = ('json', 'msgpack')
+
+    READ_SERIALIZERS = {
+        'list': SessionReadSerializer,
+        'retrieve': SessionRankReadSerializer,
+        'day_list': DayReadSerializer,
+    }
+
+    @property
+    def paginator(self):
+        """Return the paginator for this request.
+
+        Clients opt in to cursor pagination by passing `cursor`, which can be
+        empty for the first page. Otherwise the bare list is returned.
+        """
+        if not hasattr(self, '_paginator'):
+            request = getattr(self, 'request', None)
+            cursor = CursorResultsPaginator.cursor_query_param
+            if request is not None and cursor in request.query_params:
+                self._paginator = CursorResultsPaginator()
+            else:
+                self._paginator = self.pagination_class()
+        return self._paginator
+
     @decorators.detail_route(methods=['get', 'post'], url_path='day',
                              serializer_class=DaySerializer)
     def day_list(self, request: HttpRequest, pk: int):
@@ -32,6 +84,121 @@ class SessionViewSet(viewsets.ModelViewSet):
         method = request.method.lower()
         return self._day_list() if method == 'get' else self._create_day()
 
+    @decorators.list_route(methods=['post'], url_path='batch')
+    def batch(self, request: HttpRequest):
+        """Create many sessions in a single insert.
+
+        POST a list of sessions, each with a `player_name`.
+        """
+        self._validate_batch_size(request.data)
+
+        serialized = self.get_serializer(data=request.data, many=True)
+        serialized.is_valid(raise_exception=True)
+        instances = Session.objects.bulk_create(
+            Session(**attrs) for attrs in serialized.validated_data)
+        # Bulk inserts don't send post_save.
+        response_cache.bump()
+
+        for instance in instances:
+            self._send_to_websocket(instance)
+
+        return response.Response(
+            self.get_serializer(instances, many=True).data,
+            status=status.HTTP_201_CREATED)
+
+    @decorators.list_route(methods=['post'], url_path='batch/day',
+                           url_name='batch-day',
+                           serializer_class=DayBatchSerializer)
+    def batch_day(self, request: HttpRequest):
+        """Play a day for each of many sessions in a single transaction.
+
+        POST a list of days, each with the `session` uuid and the elf
+        allocation. Each day is applied separately and a result is returned
+        for each, in order, with its `status` and either the created `day` or
+        its `errors`.
+        """
+        self._validate_batch_size(request.data)
+
+        serialized = self.get_serializer(data=request.data, many=True)
+        serialized.is_valid(raise_exception=True)
+        uuids = [item['session'] for item in serialized.validated_data]
+        sessions = self.get_queryset().in_bulk(uuids)
+
+        with transaction.atomic():
+            results = [
+                self._create_batch_day(uuid, sessions.get(uuid), data)
+                for uuid, data in zip(uuids, request.data)]
+
+        for uuid in set(r['session'] for r in results if 'day' in r):
+            self._send_to_websocket(sessions[uuid])
+
+        return response.Response(results)
+
+    @decorators.detail_route(methods=['get'], serializer_class=RankSerializer)
+    def rank(self, request: HttpRequest, pk: int):
+        """Return how the completed session ranks against all others.
+        """
+        instance = self.get_object()
+        if instance.seeded:
+            return response.Response(
+                {'seed': ['Seeded sessions are not ranked']},
+                status=status.HTTP_400_BAD_REQUEST)
+
+        rank = instance.get_rank()
+        if rank is None:
+            return response.Response(
+                {'day': ['Your elf game has not completed yet']},
+                status=status.HTTP_400_BAD_REQUEST)
+        return response.Response(self.get_serializer(rank).data)
+
+    def retrieve(self, request: HttpRequest, *args, **kwargs):
+        """Return the session, or 304 Not Modified if the client's copy is
+        current.
+
+        A completed session's rank changes as other sessions complete, so it
+        is part of the ETag. The session is cached until the next write.
+        """
+        cached = self._get_cached_response()
+        if cached is not None:
+            return cached
+
+        instance = self.get_object()
+        rank = instance.get_rank()
+
+        etag = instance.etag
+        if rank is not None:
+            etag = '"{}.{rank}.{players}"'.format(etag.strip('"'), **rank)
+
+        return self._cache_response(self._get_conditional_response(
+            etag, lambda: self.get_serializer(
+                instance, context=dict(self.get_serializer_context(),
+                                       rank=rank)).data))
+
+    def list(self, request: HttpRequest, *args, **kwargs):
+        """List the sessions, cached until the next write.
+        """
+        cached = self._get_cached_response()
+        if cached is not None:
+            return cached
+        return self._cache_response(super().list(request, *args, **kwargs))
+
+    def get_serializer_class(self):
+        """Read with the lean serializers, which render the same output.
+
+        The ModelSerializers are used for the browsable API, and when the API
+        schema is generated without a request. The session is also retrieved
+        with its rank.
+        """
+        request = getattr(self, 'request', None)
+        renderer = getattr(request, 'accepted_renderer', None)
+        if (request is not None and request.method == 'GET' and
+                self.action in self.READ_SERIALIZERS and
+                getattr(renderer, 'format', None) in self.READ_FORMATS):
+            return self.READ_SERIALIZERS[self.action]
+        if self.action == 'retrieve':
+            return SessionRankSerializer
+        return super().get_serializer_class()
+
     def perform_create(self, serializer: SessionSerializer):
         """Create the new session and send to the websocket.
         """
@@ -39,38 +206,178 @@ class SessionViewSet(viewsets.ModelViewSet):
         self._send_to_websocket(instance)
 
     def _day_list(self):
-        """Return the day list.
+        """Return the day list, or 304 Not Modified if the client's copy is
+        current.
+
+        Pass `since` to only return the days after that day.
         """
-        serialized = self.get_serializer(
-            self.get_object().days.all(), many=True)
-        return response.Response(serialized.data)
+        instance = self.get_object()
+        days = instance.days.all()
+
+        since = self.request.query_params.get('since')
+        if since is not None:
+            try:
+                since = serializers.IntegerField(
+                    min_value=0).run_validation(since)
+            except serializers.ValidationError as exc:
+                raise serializers.ValidationError({'since': exc.detail})
+            days = days.filter(day__gt=since)
+
+        return self._get_conditional_response(
+            instance.etag, lambda: self.get_serializer(days, many=True).data)
 
     def _create_day(self):
         """Create a new day for a session.
 
-        Sends the created day to the websocket.
+        The session is loaded once and the day is only written if no other
+        turn was played in the meantime. With group commit on, the day is
+        written along with other concurrent turns. Sends the created day to
+        the websocket.
         """
-        serialized = DaySerializer(data=self.request.data,
-                                   context={'session': self.get_object()})
+        serialized = self.profile_serializer(DaySerializer(
+            data=self.request.data, context={'session': self.get_object()}))
         serialized.is_valid(raise_exception=True)
-        instance = serialized.save()
+        try:
+            instance = group_commit.run(serialized.save)
+        except TurnConflict as exc:
+            return response.Response({'day': [str(exc)]},
+                                     status=status.HTTP_409_CONFLICT)
 
         self._send_day_to_websocket(instance)
 
         return response.Response(serialized.data,
                                  status=status.HTTP_201_CREATED)
 
+    def _create_batch_day(self, uuid, session: Session, data: dict):
+        """Create a single day from a batch, returning its result.
+        """
+        if session is None:
+            return {
+                'session': uuid,
+                'status': status.HTTP_404_NOT_FOUND,
+                'errors': {'session': ['Not found.']},
+            }
+
+        serialized = DaySerializer(data=data, context={'session': session})
+        if not serialized.is_valid():
+            return {
+                'session': uuid,
+                'status': status.HTTP_400_BAD_REQUEST,
+                'errors': serialized.errors,
+            }
+
+        try:
+            serialized.save()
+        except TurnConflict as exc:
+            return {
+                'session': uuid,
+                'status': status.HTTP_409_CONFLICT,
+                'errors': {'day': [str(exc)]},
+            }
+
+        return {
+            'session': uuid,
+            'status': status.HTTP_201_CREATED,
+            'day': serialized.data,
+        }
+
+    def _get_conditional_response(self, etag, get_data):
+        """Return 304 Not Modified if the request's ETag matches, otherwise
+        the data from `get_data`.
+
+        Both responses carry the ETag. There's no Last-Modified date, as
+        its one-second precision can't tell apart turns played in the same
+        second, so If-Modified-Since is ignored.
+        """
+        result = get_conditional_response(self.request, etag=etag)
+        if result is None:
+            result = response.Response(get_data())
+
+        result['ETag'] = etag
+        return result
+
+    def _get_cached_response(self):
+        """Return the cached response to this request, or None.
+
+        A cached response with an ETag still answers conditional requests
+        with 304 Not Modified. Otherwise the key to cache the response under
+        is kept, so it's cached under the version it was read at.
+        """
+        self._cache_key, cached = response_cache.get(
+            self.request.build_absolute_uri())
+        if cached is None:
+            return None
+
+        data, headers = cached
+        result = None
+        if 'ETag' in headers:
+            result = get_conditional_response(self.request,
+                                              etag=headers['ETag'])
+        if result is None:
+            result = response.Response(data)
+
+        for header, value in headers.items():
+            result[header] = value
+        result['X-Cache'] = 'HIT'
+        return result
+
+    def _cache_response(self, result):
+        """Cache the data and validators of a successful response, under the
+        key found by `_get_cached_response`.
+        """
+        if result.status_code == status.HTTP_200_OK:
+            headers = {header: result[header]
+                       for header in self.CACHED_HEADERS
+                       if result.has_header(header)}
+            response_cache.set(self._cache_key, (result.data, headers))
+        result['X-Cache'] = 'MISS'
+        return result
+
+    def _validate_batch_size(self, data):
+        """Validate a batch is no larger than MAX_BATCH_SIZE.
+        """
+        if isinstance(data, list) and len(data) > self.MAX_BATCH_SIZE:
+            raise serializers.ValidationError({
+                'non_field_errors': [
+                    'A batch can hold at most {} items'.format(
+                        self.MAX_BATCH_SIZE)]
+            })
+
     def _send_day_to_websocket(self, instance: Day):
         """Send the passed-in day to the websocket.
         """
         self._send_to_websocket(instance.session)
 
     def _send_to_websocket(self, instance: Session):
-        """Send the updated game session information.
+        """Send the updated game session information once it's committed.
+
+        The session is serialized and sent in the background.
         """
-        serializer = SessionSerializer(instance)
+        transaction.on_commit(lambda: broadcaster.submit(instance))
 
-        output = dumps(serializer.data)
-        Group('session').send({
-            'text': output
-        })
+
+class LeaderboardViewSet(mixins.ListModelMixin, viewsets.GenericViewSet):
+    """List the completed sessions that made the most money.
+
+    Use `limit` to set how many sessions are returned.
+    """
+
+    filter_backends = ()
+    queryset = Session.objects.leaderboard().with_totals()
+    pagination_class = LeaderboardPaginator
+    serializer_class = SessionReadSerializer
+
+
+def metrics(request: HttpRequest):
+    """Return this process's metrics in the Prometheus text format.
+
+    Only staff and scrapers connecting from ELVES_METRICS_IPS can read them.
+    A request forwarded by a proxy appears to come from the proxy, so one
+    with a forwarding header is never let in by its address.
+    """
+    forwarded = any(header in request.META for header in FORWARDED_HEADERS)
+    if not request.user.is_staff and (
+            forwarded or
+            request.META.get('REMOTE_ADDR') not in settings.ELVES_METRICS_IPS):
+        raise PermissionDenied
+    return HttpResponse(registry.render(), content_type=CONTENT_TYPE)
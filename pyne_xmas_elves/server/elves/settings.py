@@ -10,7 +10,9 @@ For the full list of settings and their values, see
 https://docs.djangoproject.com/en/1.11/ref/settings/
 """
 
+import importlib.util
 import os
+import tempfile
 
 # Build paths inside the project like this: os.path.join(BASE_DIR, ...)
 BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
@@ -47,6 +49,7 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'elves.game.middleware.MetricsMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -87,6 +90,59 @@ DATABASES = {
     }
 }
 
+# Pragmas run on every new SQLite connection.
+ELVES_SQLITE_PRAGMAS = {}
+
+# Set ELVES_STORAGE=production to keep connections open between requests and
+# run SQLite in WAL mode, so reads don't wait for turns being written.
+if os.environ.get('ELVES_STORAGE') == 'production':
+    DATABASES['default'].update({
+        'CONN_MAX_AGE': 600,
+        'OPTIONS': {
+            'timeout': 20,
+        },
+    })
+    ELVES_SQLITE_PRAGMAS = {
+        'journal_mode': 'WAL',
+        'synchronous': 'NORMAL',
+        'temp_store': 'MEMORY',
+        'cache_size': -16000,
+    }
+
+# Concurrent turns are written in one transaction per window (seconds). 0
+# writes each turn in its own transaction.
+ELVES_GROUP_COMMIT = float(os.environ.get('ELVES_GROUP_COMMIT', 0))
+
+
+# Session lists and details are cached until the next write, see
+# elves.game.cache. Set ELVES_CACHE_DIR to share the cache between the worker
+# processes on one box.
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'elves',
+        'OPTIONS': {
+            'MAX_ENTRIES': 1000,
+        },
+    },
+}
+
+if 'ELVES_CACHE_DIR' in os.environ:
+    CACHES['default'] = {
+        'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+        'LOCATION': os.environ['ELVES_CACHE_DIR'],
+        'OPTIONS': {
+            'MAX_ENTRIES': 10000,
+        },
+    }
+
+ELVES_RESPONSE_CACHE = 'default'
+
+# Staff can profile a request with ?profile=trace, see elves.game.profiling,
+# which writes the profile here.
+ELVES_PROFILE_DIR = os.environ.get(
+    'ELVES_PROFILE_DIR', os.path.join(tempfile.gettempdir(), 'elves-profiles'))
+
 
 # Password validation
 # https://docs.djangoproject.com/en/1.11/ref/settings/#auth-password-validators
@@ -112,8 +168,25 @@ REST_FRAMEWORK = {
         'django_filters.rest_framework.DjangoFilterBackend',
         'rest_framework.filters.OrderingFilter',
     ],
+    # JSON is rendered with orjson when it's installed.
+    'DEFAULT_RENDERER_CLASSES': [
+        'elves.game.renderers.FastJSONRenderer',
+        'rest_framework.renderers.BrowsableAPIRenderer',
+    ],
+    'DEFAULT_PARSER_CLASSES': [
+        'rest_framework.parsers.JSONParser',
+        'rest_framework.parsers.FormParser',
+        'rest_framework.parsers.MultiPartParser',
+    ],
 }
 
+# Bots can send and receive MessagePack when it's installed.
+if importlib.util.find_spec('msgpack') is not None:
+    REST_FRAMEWORK['DEFAULT_RENDERER_CLASSES'].append(
+        'elves.game.renderers.MessagePackRenderer')
+    REST_FRAMEWORK['DEFAULT_PARSER_CLASSES'].append(
+        'elves.game.parsers.MessagePackParser')
+
 # Internationalization
 # https://docs.djangoproject.com/en/1.11/topics/i18n/
 
@@ -133,13 +206,52 @@ USE_TZ = True
 
 STATIC_URL = '/appstatic/'
 
-CHANNEL_LAYERS = {
-    "default": {
-        "BACKEND": "asgiref.inmemory.ChannelLayer",
-        "ROUTING": "elves.game.routing.CHANNEL_ROUTING",
+# The in-memory layer only works inside one process. To run several workers,
+# set ELVES_CHANNEL_LAYER to "ipc" to share a layer between the processes on
+# one box (pip install asgi_ipc) or "redis" (pip install asgi_redis).
+CHANNEL_LAYER_BACKENDS = {
+    'inmemory': {
+        'BACKEND': 'asgiref.inmemory.ChannelLayer',
+    },
+    'ipc': {
+        'BACKEND': 'asgi_ipc.IPCChannelLayer',
+        'CONFIG': {
+            'prefix': 'elves',
+            'capacity': 100,
+        },
     },
+    'redis': {
+        'BACKEND': 'asgi_redis.RedisChannelLayer',
+        'CONFIG': {
+            'hosts': [os.environ.get('ELVES_REDIS_URL',
+                                     'redis://localhost:6379/0')],
+            'prefix': 'elves:',
+        },
+    },
+}
+
+CHANNEL_LAYERS = {
+    "default": dict(
+        CHANNEL_LAYER_BACKENDS[
+            os.environ.get('ELVES_CHANNEL_LAYER', 'inmemory')],
+        ROUTING="elves.game.routing.CHANNEL_ROUTING",
+    ),
 }
 
+# Session updates are batched into one websocket frame per window (seconds).
+ELVES_BROADCAST_WINDOW = 0.1
+
+# A session's seed decides its weather, so only staff can choose it. Set
+# ELVES_ALLOW_SEEDS=1 to let anyone seed a session, for load tests. Seeded
+# sessions are never ranked either way.
+ELVES_ALLOW_SEEDS = os.environ.get('ELVES_ALLOW_SEEDS') == '1'
+
+# /metrics is served to staff, and to scrapers connecting straight from one of
+# these comma-separated addresses. Requests forwarded by a proxy are never
+# allowed by address, as they come from the proxy's.
+ELVES_METRICS_IPS = os.environ.get('ELVES_METRICS_IPS',
+                                   '127.0.0.1,::1').split(',')
+
 if 'TEST_RUNNER' in os.environ:
     TEST_RUNNER = os.environ['TEST_RUNNER']
     TEST_OUTPUT_DIR = os.environ.get('TEST_OUTPUT_DIR', '.')
@@ -19,9 +19,11 @@ from django.contrib import admin
 from rest_framework.documentation import include_docs_urls
 
 from .game import router as game_router
+from .game.views import metrics
 
 urlpatterns = [
     url(r'^admin/', admin.site.urls),
     url(r'^docs/', include_docs_urls(title='Great Elf Game API')),
+    url(r'^metrics$', metrics, name='metrics'),
     url(r'', include(game_router)),
 ]
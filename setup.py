@@ -22,7 +22,17 @@ setup(name='pyne-xmas-elves',
       license='MIT',
       long_description=DESCRIPTION,
       packages=['pyne_xmas_elves.client', 'pyne_xmas_elves.server'],
+      package_data={
+          'pyne_xmas_elves.client': ['policy.json'],
+      },
       python_requires='>=3.5',
       install_requires=requirements,
+      extras_require={
+          'async': ['aiohttp'],
+          'simulate': ['numpy'],
+          'ipc': ['asgi_ipc'],
+          'redis': ['asgi_redis'],
+          'fast': ['orjson', 'msgpack-python'],
+      },
       scripts=['bin/elves.py'],
       zip_safe=False)
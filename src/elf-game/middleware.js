@@ -1,11 +1,26 @@
-export function createWebsocketMiddleware(url) {
+import { fetchGames } from "./actions";
+
+/**
+ * Apply the batched session updates from the websocket to the store.
+ * @param {string} url The websocket URL.
+ * @param {string} gamesUrl The game list URL, reloaded when a frame is missed.
+ */
+export function createWebsocketMiddleware(url, gamesUrl) {
   const socket = new WebSocket(url);
+  // Each server worker numbers its own frames, so follow each stream.
+  const lastSeq = {};
 
   return store => next => action => {
     switch (action.type) {
       case "CONNECT_WEBSOCKET":
         socket.onmessage = event => {
-          store.dispatch({ type: "UPDATE_GAME", game: JSON.parse(event.data) });
+          const frame = JSON.parse(event.data);
+          const last = lastSeq[frame.stream];
+          if (last !== undefined && frame.seq !== last + 1) {
+            store.dispatch(fetchGames(gamesUrl));
+          }
+          lastSeq[frame.stream] = frame.seq;
+          store.dispatch({ type: "PATCH_GAMES", games: frame.sessions });
         };
         break;
       default:
@@ -7,16 +7,16 @@ import { combineReducers } from "redux";
  * @param {Object} action The action to perform.
  * @param {string} action.type The action to perform.
  * @param {string} action.status Either 'success' or 'error'.
- * @param {Object[]} [action.games] The list of games.
- * @param {Object} [action.game] The game to update.
+ * @param {Object[]|Object} [action.games] The list of games, or the map of
+ *   UUID -> changed game fields.
  * @return {Object} The new state object.
  */
 function games(state = {}, action) {
   switch (action.type) {
     case "RESET_GAME_LIST":
       return getGameList(action.games);
-    case "UPDATE_GAME":
-      return updateGameList(state, action.game);
+    case "PATCH_GAMES":
+      return patchGameList(state, action.games);
     default:
       return state;
   }
@@ -35,19 +35,24 @@ function getGameList(games = []) {
 }
 
 /**
- * Insert or update the given game list into the state.
+ * Merge the changed fields of each game into the state.
  * @param {Object} state The state object
  * @param {string[]} state.uuids The list of uuids
  * @param {Object[]} state.gameMap The map of UUID -> games
- * @param {Object} game The updated game object
+ * @param {Object} games The map of UUID -> changed game fields
  * @return {Object} The gameMap and uuids
  */
-function updateGameList(state, game) {
+function patchGameList(state, games) {
   const gameByUuid = {};
-  gameByUuid[game.uuid] = game;
+  Object.keys(games).forEach(
+    uuid =>
+      (gameByUuid[uuid] = Object.assign({}, state.gameMap[uuid], games[uuid], {
+        uuid
+      }))
+  );
   return {
     gameMap: Object.assign({}, state.gameMap, gameByUuid),
-    uuids: uniq([...state.uuids, game.uuid])
+    uuids: uniq([...state.uuids, ...Object.keys(games)])
   };
 }
 
@@ -19,15 +19,17 @@ const local = window.location.host.startsWith("localhost");
 const host = local ? "localhost:8000" : "elves.pythonnortheast.com";
 const secure = local ? "" : "s";
 
+const gamesUrl = `http${secure}://${host}/game/`;
+
 const store = createStore(
   elfGame,
   { games: { gameMap: {}, uuids: [] } },
   applyMiddleware(
     thunkMiddleware,
-    createWebsocketMiddleware(`ws${secure}://${host}/session/`)
+    createWebsocketMiddleware(`ws${secure}://${host}/session/`, gamesUrl)
   )
 );
-store.dispatch(fetchGames(`http${secure}://${host}/game/`));
+store.dispatch(fetchGames(gamesUrl));
 store.dispatch({ type: "CONNECT_WEBSOCKET" });
 
 ReactDOM.render(